@@ -4,6 +4,7 @@ use hdrhistogram::Histogram;
 use rand::{Rng, RngCore, SeedableRng};
 use rand::rngs::StdRng;
 use serde::Serialize;
+use std::path::{Path, PathBuf};
 use std::time::{Duration, SystemTime, UNIX_EPOCH};
 use tokio::time::Instant;
 
@@ -50,6 +51,10 @@ enum Command {
 
         #[arg(long, default_value_t = 1)]
         seed: u64,
+
+        /// Also write the final JSON summary to this file.
+        #[arg(long)]
+        summary_path: Option<PathBuf>,
     },
 
     /// Subscribe to a service name (or discover by pattern) and measure latency.
@@ -71,6 +76,10 @@ enum Command {
 
         #[arg(long, default_value_t = 1)]
         seed: u64,
+
+        /// Also write the final JSON summary to this file.
+        #[arg(long)]
+        summary_path: Option<PathBuf>,
     },
 }
 
@@ -173,6 +182,18 @@ fn decode_latency_us(payload: &[u8]) -> Option<u64> {
     Some((now_us - sent_us) as u64)
 }
 
+/// Print the summary as the last stdout line and, if asked, write it to a file
+/// so the harness can read it even when stdout is not kept.
+fn emit_summary<T: Serialize>(summary: &T, summary_path: Option<&Path>) -> anyhow::Result<()> {
+    let line = serde_json::to_string(summary)?;
+    if let Some(path) = summary_path {
+        std::fs::write(path, format!("{line}\n"))
+            .with_context(|| format!("write summary to {}", path.display()))?;
+    }
+    println!("{line}");
+    Ok(())
+}
+
 async fn run_publisher(
     service: String,
     registry: String,
@@ -183,16 +204,23 @@ async fn run_publisher(
     payload_bytes: usize,
     payload_profile: PayloadProfile,
     seed: u64,
+    summary_path: Option<PathBuf>,
 ) -> anyhow::Result<()> {
     let publisher = Arc::new(Publisher::new(service.clone(), bind, registry.clone()));
+    let mut registered = publisher.registered();
 
-    let publisher_task = {
+    let mut publisher_task = {
         let publisher = publisher.clone();
         tokio::spawn(async move { publisher.start().await.context("publisher start failed") })
     };
 
-    // Give the server time to bind and register.
-    tokio::time::sleep(Duration::from_millis(900)).await;
+    // Tell the harness we are serving once the registry knows about us, so it
+    // can start subscribers right away. If start fails, the loop below exits
+    // at once and we report zero publishes.
+    tokio::select! {
+        _ = registered.wait_for(|r| *r) => println!("READY"),
+        _ = &mut publisher_task => {}
+    }
 
     let start = Instant::now();
     let deadline = Duration::from_secs(duration_secs);
@@ -254,8 +282,7 @@ async fn run_publisher(
         publish_errors,
     };
 
-    println!("{}", serde_json::to_string(&summary)?);
-    Ok(())
+    emit_summary(&summary, summary_path.as_deref())
 }
 
 async fn run_subscriber(
@@ -265,6 +292,7 @@ async fn run_subscriber(
     duration_secs: u64,
     max_samples: Option<u64>,
     seed: u64,
+    summary_path: Option<PathBuf>,
 ) -> anyhow::Result<()> {
     let mut client = WindClient::new(registry.clone());
 
@@ -382,8 +410,7 @@ async fn run_subscriber(
         latency,
     };
 
-    println!("{}", serde_json::to_string(&summary)?);
-    Ok(())
+    emit_summary(&summary, summary_path.as_deref())
 }
 
 #[tokio::main]
@@ -401,6 +428,7 @@ async fn main() -> anyhow::Result<()> {
             payload_bytes,
             payload_profile,
             seed,
+            summary_path,
         } => run_publisher(
             service,
             registry,
@@ -411,6 +439,7 @@ async fn main() -> anyhow::Result<()> {
             payload_bytes,
             payload_profile,
             seed,
+            summary_path,
         )
         .await,
 
@@ -421,6 +450,16 @@ async fn main() -> anyhow::Result<()> {
             duration_secs,
             max_samples,
             seed,
-        } => run_subscriber(registry, service, pattern, duration_secs, max_samples, seed).await,
+            summary_path,
+        } => run_subscriber(
+            registry,
+            service,
+            pattern,
+            duration_secs,
+            max_samples,
+            seed,
+            summary_path,
+        )
+        .await,
     }
 }
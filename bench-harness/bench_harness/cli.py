@@ -1,13 +1,27 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import datetime as _dt
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Callable, Iterator
 
 from .results import RunPaths
+from .proc import ManagedProcess, raise_fd_limit
 from .metrics import Histogram, summarize_hist
+from .resources import ResourceMonitor
 from .scenarios import (
     Binaries,
+    default_cpu_plan,
+    estimate_fds,
+    keep_stat_fds,
+    shared_registry,
     run_a1_once,
     run_a2_once,
     run_a3_once,
@@ -21,6 +35,196 @@ def _path(p: str) -> Path:
     return Path(p).expanduser().resolve()
 
 
+_Arg = tuple[str, dict[str, Any]]
+
+# shared by every scenario: binaries/output/registry first, timing/repeats last
+_LEADING_ARGS: tuple[_Arg, ...] = (
+    ("--wind-registry", {"type": _path, "default": _path("../target/release/wind-registry")}),
+    ("--wind-agent", {"type": _path, "default": _path("./agents/wind-agent/target/release/wind-agent")}),
+    ("--results-dir", {"type": _path, "default": _path("./results")}),
+    ("--registry-addr", {"default": "127.0.0.1:7001"}),
+)
+_TRAILING_ARGS: tuple[_Arg, ...] = (
+    ("--duration-secs", {"type": int, "default": 5}),
+    ("--seed", {"type": int, "default": 1}),
+    ("--runs", {"type": int, "default": 5}),
+    ("--parallel", {"type": int, "default": 1}),
+    # keep one registry up across serial runs instead of one per run
+    ("--shared-registry", {"action": "store_true"}),
+    # subscriber stdout: full log, only its last 4 KiB, discarded, or every
+    # agent prefixed into one scenario.log per run
+    ("--capture-stdout", {"choices": ("file", "tail", "null", "shared"), "default": "file"}),
+    # disjoint CPU sets for registry, publishers, subscribers and the harness
+    ("--pin-cpus", {"action": "store_true"}),
+)
+
+
+@dataclass(frozen=True)
+class _Scenario:
+    help: str
+    args: tuple[_Arg, ...]
+    # returns (result, merged subscriber histogram)
+    runner: Callable[..., tuple[dict[str, Any], Histogram]]
+    # argparse dests forwarded to the runner under the same name
+    params: tuple[str, ...]
+    # whether the runner takes services derived from --service-prefix/--publishers
+    uses_services: bool
+
+
+_SCENARIOS: dict[str, _Scenario] = {
+    "a1": _Scenario(
+        help="Suite A1 baseline latency",
+        args=(
+            ("--service", {"default": "BENCH/A1/LATENCY"}),
+            ("--payload-bytes", {"type": int, "default": 256}),
+            ("--hz", {"type": float, "default": 1000.0}),
+            ("--poisson", {"action": "store_true"}),
+        ),
+        runner=run_a1_once,
+        params=("service", "payload_bytes", "hz", "poisson"),
+        uses_services=False,
+    ),
+    "a2": _Scenario(
+        help="Suite A2 fan-out throughput",
+        args=(
+            ("--service", {"default": "BENCH/A2/FANOUT"}),
+            ("--subscribers", {"type": int, "default": 10}),
+            ("--payload-bytes", {"type": int, "default": 1024}),
+            ("--hz", {"type": float, "default": 10_000.0}),
+        ),
+        runner=run_a2_once,
+        params=("service", "subscribers", "payload_bytes", "hz"),
+        uses_services=False,
+    ),
+    "a3": _Scenario(
+        help="Suite A3 fan-in stress",
+        args=(
+            ("--service-prefix", {"default": "BENCH/A3/FANIN"}),
+            ("--publishers", {"type": int, "default": 10}),
+            ("--payload-bytes", {"type": int, "default": 1024}),
+            ("--hz-per-publisher", {"type": float, "default": 1000.0}),
+        ),
+        runner=run_a3_once,
+        params=("payload_bytes", "hz_per_publisher"),
+        uses_services=True,
+    ),
+    "a4": _Scenario(
+        help="Suite A4 scalability",
+        args=(
+            ("--service-prefix", {"default": "BENCH/A4/SCALE"}),
+            ("--publishers", {"type": int, "default": 10}),
+            ("--subscribers", {"type": int, "default": 100}),
+            ("--publishers-per-subscriber", {"type": int, "default": 10}),
+            ("--payload-bytes", {"type": int, "default": 1024}),
+            ("--hz-per-publisher", {"type": float, "default": 1000.0}),
+        ),
+        runner=run_a4_once,
+        params=("subscribers", "publishers_per_subscriber", "payload_bytes", "hz_per_publisher"),
+        uses_services=True,
+    ),
+    "b1": _Scenario(
+        help="Suite B1 stochastic latency profile",
+        args=(
+            ("--service", {"default": "BENCH/B1/LATENCY"}),
+            ("--lambda-hz", {"type": float, "default": 10_000.0}),
+        ),
+        runner=run_b1_once,
+        params=("service", "lambda_hz"),
+        uses_services=False,
+    ),
+    "b2": _Scenario(
+        help="Suite B2 scalability under chaos",
+        args=(
+            ("--service-prefix", {"default": "BENCH/B2/CHAOS"}),
+            ("--publishers", {"type": int, "default": 10}),
+            ("--subscribers", {"type": int, "default": 50}),
+            ("--publishers-per-subscriber", {"type": int, "default": 10}),
+            ("--lambda-hz-per-publisher", {"type": float, "default": 1000.0}),
+        ),
+        runner=run_b2_once,
+        params=("subscribers", "publishers_per_subscriber", "lambda_hz_per_publisher"),
+        uses_services=True,
+    ),
+}
+
+
+def _replicate_addr(registry_addr: str, i: int) -> str:
+    # concurrent replicates each get their own registry port
+    host, _, port = registry_addr.rpartition(":")
+    return f"{host}:{int(port) + i}"
+
+
+def _write_results(q: queue.Queue[tuple[str, Any] | None], paths: RunPaths, errors: list[Exception]) -> None:
+    # drains (rel_path, obj) pairs until the None sentinel; keeps going after a
+    # failure so the producer never blocks, and reports it via `errors`
+    while (item := q.get()) is not None:
+        rel, obj = item
+        try:
+            paths.write_json(rel, obj)
+        except Exception as e:
+            errors.append(e)
+
+
+def _do_run(
+    scenario_name: str,
+    bins: Binaries,
+    registry_addr: str,
+    duration_secs: int,
+    seed: int,
+    out_dir: Path,
+    kwargs: dict[str, Any],
+    monitor: ResourceMonitor | None = None,
+    registry: ManagedProcess | None = None,
+) -> tuple[dict[str, Any], Histogram]:
+    # module-level so it can be shipped to ProcessPoolExecutor workers
+    return _SCENARIOS[scenario_name].runner(
+        bins=bins,
+        registry_addr=registry_addr,
+        duration_secs=duration_secs,
+        seed=seed,
+        out_dir=out_dir,
+        monitor=monitor,
+        registry=registry,
+        **kwargs,
+    )
+
+
+# positional _do_run arguments for one run of a sweep
+_Job = tuple[str, Binaries, str, int, int, Path, dict[str, Any]]
+
+
+def _run_sweep(
+    jobs: list[_Job],
+    *,
+    parallel: int,
+    monitor: ResourceMonitor | None = None,
+    registry: ManagedProcess | None = None,
+) -> Iterator[tuple[int, dict[str, Any], Histogram]]:
+    # Yields (run index, result, histogram) as each run finishes. With
+    # parallel > 1 the runs go to a process pool and come back in completion
+    # order; each job must then carry its own registry_addr and out_dir, and
+    # the in-process monitor/registry cannot be shared with the workers.
+    if parallel <= 1:
+        for i, job in enumerate(jobs):
+            yield (i, *_do_run(*job, monitor=monitor, registry=registry))
+        return
+
+    # By now the result writer thread is running, and forking a threaded
+    # process can deadlock the child; workers come from a clean forkserver.
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    ctx = multiprocessing.get_context(method)
+    with ProcessPoolExecutor(max_workers=parallel, mp_context=ctx) as pool:
+        futures = {pool.submit(_do_run, *job): i for i, job in enumerate(jobs)}
+        try:
+            for fut in as_completed(futures):
+                yield (futures[fut], *fut.result())
+        except BaseException:
+            # a failed replicate (or a caller that stops early) fails the
+            # sweep: drop the runs that have not started yet
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
 def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(prog="bench-harness")
     sub = parser.add_subparsers(dest="cmd", required=True)
@@ -28,211 +232,128 @@ def main(argv: list[str] | None = None) -> int:
     run = sub.add_parser("run", help="run scenarios")
     run_sub = run.add_subparsers(dest="scenario", required=True)
 
-    a1 = run_sub.add_parser("a1", help="Suite A1 baseline latency")
-    a1.add_argument("--wind-registry", type=_path, default=_path("../target/release/wind-registry"))
-    a1.add_argument("--wind-agent", type=_path, default=_path("./agents/wind-agent/target/release/wind-agent"))
-    a1.add_argument("--results-dir", type=_path, default=_path("./results"))
-    a1.add_argument("--registry-addr", default="127.0.0.1:7001")
-    a1.add_argument("--service", default="BENCH/A1/LATENCY")
-    a1.add_argument("--payload-bytes", type=int, default=256)
-    a1.add_argument("--hz", type=float, default=1000.0)
-    a1.add_argument("--duration-secs", type=int, default=5)
-    a1.add_argument("--poisson", action="store_true")
-    a1.add_argument("--seed", type=int, default=1)
-    a1.add_argument("--runs", type=int, default=5)
-
-    a2 = run_sub.add_parser("a2", help="Suite A2 fan-out throughput")
-    a2.add_argument("--wind-registry", type=_path, default=_path("../target/release/wind-registry"))
-    a2.add_argument("--wind-agent", type=_path, default=_path("./agents/wind-agent/target/release/wind-agent"))
-    a2.add_argument("--results-dir", type=_path, default=_path("./results"))
-    a2.add_argument("--registry-addr", default="127.0.0.1:7001")
-    a2.add_argument("--service", default="BENCH/A2/FANOUT")
-    a2.add_argument("--subscribers", type=int, default=10)
-    a2.add_argument("--payload-bytes", type=int, default=1024)
-    a2.add_argument("--hz", type=float, default=10_000.0)
-    a2.add_argument("--duration-secs", type=int, default=5)
-    a2.add_argument("--seed", type=int, default=1)
-    a2.add_argument("--runs", type=int, default=5)
-
-    a3 = run_sub.add_parser("a3", help="Suite A3 fan-in stress")
-    a3.add_argument("--wind-registry", type=_path, default=_path("../target/release/wind-registry"))
-    a3.add_argument("--wind-agent", type=_path, default=_path("./agents/wind-agent/target/release/wind-agent"))
-    a3.add_argument("--results-dir", type=_path, default=_path("./results"))
-    a3.add_argument("--registry-addr", default="127.0.0.1:7001")
-    a3.add_argument("--service-prefix", default="BENCH/A3/FANIN")
-    a3.add_argument("--publishers", type=int, default=10)
-    a3.add_argument("--payload-bytes", type=int, default=1024)
-    a3.add_argument("--hz-per-publisher", type=float, default=1000.0)
-    a3.add_argument("--duration-secs", type=int, default=5)
-    a3.add_argument("--seed", type=int, default=1)
-    a3.add_argument("--runs", type=int, default=5)
-
-    a4 = run_sub.add_parser("a4", help="Suite A4 scalability")
-    a4.add_argument("--wind-registry", type=_path, default=_path("../target/release/wind-registry"))
-    a4.add_argument("--wind-agent", type=_path, default=_path("./agents/wind-agent/target/release/wind-agent"))
-    a4.add_argument("--results-dir", type=_path, default=_path("./results"))
-    a4.add_argument("--registry-addr", default="127.0.0.1:7001")
-    a4.add_argument("--service-prefix", default="BENCH/A4/SCALE")
-    a4.add_argument("--publishers", type=int, default=10)
-    a4.add_argument("--subscribers", type=int, default=100)
-    a4.add_argument("--publishers-per-subscriber", type=int, default=10)
-    a4.add_argument("--payload-bytes", type=int, default=1024)
-    a4.add_argument("--hz-per-publisher", type=float, default=1000.0)
-    a4.add_argument("--duration-secs", type=int, default=5)
-    a4.add_argument("--seed", type=int, default=1)
-    a4.add_argument("--runs", type=int, default=5)
-
-    b1 = run_sub.add_parser("b1", help="Suite B1 stochastic latency profile")
-    b1.add_argument("--wind-registry", type=_path, default=_path("../target/release/wind-registry"))
-    b1.add_argument("--wind-agent", type=_path, default=_path("./agents/wind-agent/target/release/wind-agent"))
-    b1.add_argument("--results-dir", type=_path, default=_path("./results"))
-    b1.add_argument("--registry-addr", default="127.0.0.1:7001")
-    b1.add_argument("--service", default="BENCH/B1/LATENCY")
-    b1.add_argument("--lambda-hz", type=float, default=10_000.0)
-    b1.add_argument("--duration-secs", type=int, default=5)
-    b1.add_argument("--seed", type=int, default=1)
-    b1.add_argument("--runs", type=int, default=5)
-
-    b2 = run_sub.add_parser("b2", help="Suite B2 scalability under chaos")
-    b2.add_argument("--wind-registry", type=_path, default=_path("../target/release/wind-registry"))
-    b2.add_argument("--wind-agent", type=_path, default=_path("./agents/wind-agent/target/release/wind-agent"))
-    b2.add_argument("--results-dir", type=_path, default=_path("./results"))
-    b2.add_argument("--registry-addr", default="127.0.0.1:7001")
-    b2.add_argument("--service-prefix", default="BENCH/B2/CHAOS")
-    b2.add_argument("--publishers", type=int, default=10)
-    b2.add_argument("--subscribers", type=int, default=50)
-    b2.add_argument("--publishers-per-subscriber", type=int, default=10)
-    b2.add_argument("--lambda-hz-per-publisher", type=float, default=1000.0)
-    b2.add_argument("--duration-secs", type=int, default=5)
-    b2.add_argument("--seed", type=int, default=1)
-    b2.add_argument("--runs", type=int, default=5)
+    for name, scenario in _SCENARIOS.items():
+        p = run_sub.add_parser(name, help=scenario.help)
+        for flag, kwargs in (*_LEADING_ARGS, *scenario.args, *_TRAILING_ARGS):
+            p.add_argument(flag, **kwargs)
 
     args = parser.parse_args(argv)
 
     if args.cmd == "run":
+        scenario = _SCENARIOS[args.scenario]
         run_id = _dt.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-        paths = RunPaths.create(args.results_dir, f"{args.scenario}-{run_id}")
-        bins = Binaries(wind_registry=args.wind_registry, wind_agent=args.wind_agent)
+        runs = int(getattr(args, "runs", 1))
+        parallel = max(1, min(args.parallel, runs))
+        # pool workers are separate processes that cannot share our registry
+        if args.shared_registry and parallel > 1:
+            run.error("--shared-registry cannot be combined with --parallel")
 
-        total_hist = Histogram(counts=[])
-        per_run: list[dict[str, object]] = []
+        cpu_plan = None
+        if args.pin_cpus:
+            # concurrent replicates would all be pinned onto the same CPUs
+            if parallel > 1:
+                run.error("--pin-cpus cannot be combined with --parallel")
+            cpu_plan = default_cpu_plan()
+            if cpu_plan is None:
+                run.error("--pin-cpus needs at least 4 usable CPUs")
 
-        for i in range(int(getattr(args, "runs", 1))):
-            run_out = paths.raw_dir / f"run-{i:02d}"
-            run_out.mkdir(parents=True, exist_ok=True)
-
-            if args.scenario == "a1":
-                result = run_a1_once(
-                    bins=bins,
-                    registry_addr=args.registry_addr,
-                    service=args.service,
-                    payload_bytes=args.payload_bytes,
-                    hz=args.hz,
-                    duration_secs=args.duration_secs,
-                    poisson=args.poisson,
-                    seed=args.seed + i,
-                    out_dir=run_out,
-                )
-                sub = result.get("subscriber") or {}
-                run_hist = Histogram.from_json(sub.get("latency_hist"))
-            elif args.scenario == "a2":
-                result = run_a2_once(
-                    bins=bins,
-                    registry_addr=args.registry_addr,
-                    service=args.service,
-                    subscribers=args.subscribers,
-                    payload_bytes=args.payload_bytes,
-                    hz=args.hz,
-                    duration_secs=args.duration_secs,
-                    seed=args.seed + i,
-                    out_dir=run_out,
-                )
-                subs = result.get("subscribers") or []
-                run_hist = Histogram(counts=[])
-                for sub in subs:
-                    run_hist = run_hist.merge(Histogram.from_json(sub.get("latency_hist")))
-            elif args.scenario == "a3":
-                services = [f"{args.service_prefix}/{j:04d}" for j in range(args.publishers)]
-                result = run_a3_once(
-                    bins=bins,
-                    registry_addr=args.registry_addr,
-                    services=services,
-                    payload_bytes=args.payload_bytes,
-                    hz_per_publisher=args.hz_per_publisher,
-                    duration_secs=args.duration_secs,
-                    seed=args.seed + i,
-                    out_dir=run_out,
-                )
-                sub = result.get("subscriber") or {}
-                run_hist = Histogram.from_json(sub.get("latency_hist"))
-            elif args.scenario == "a4":
-                services = [f"{args.service_prefix}/{j:04d}" for j in range(args.publishers)]
-                result = run_a4_once(
-                    bins=bins,
-                    registry_addr=args.registry_addr,
-                    services=services,
-                    subscribers=args.subscribers,
-                    publishers_per_subscriber=args.publishers_per_subscriber,
-                    payload_bytes=args.payload_bytes,
-                    hz_per_publisher=args.hz_per_publisher,
-                    duration_secs=args.duration_secs,
-                    seed=args.seed + i,
-                    out_dir=run_out,
-                )
-                subs = result.get("subscribers") or []
-                run_hist = Histogram(counts=[])
-                for sub in subs:
-                    run_hist = run_hist.merge(Histogram.from_json(sub.get("latency_hist")))
-            elif args.scenario == "b1":
-                result = run_b1_once(
-                    bins=bins,
-                    registry_addr=args.registry_addr,
-                    service=args.service,
-                    lambda_hz=args.lambda_hz,
-                    duration_secs=args.duration_secs,
-                    seed=args.seed + i,
-                    out_dir=run_out,
-                )
-                sub = result.get("subscriber") or {}
-                run_hist = Histogram.from_json(sub.get("latency_hist"))
-            elif args.scenario == "b2":
-                services = [f"{args.service_prefix}/{j:04d}" for j in range(args.publishers)]
-                result = run_b2_once(
-                    bins=bins,
-                    registry_addr=args.registry_addr,
-                    services=services,
-                    subscribers=args.subscribers,
-                    publishers_per_subscriber=args.publishers_per_subscriber,
-                    lambda_hz_per_publisher=args.lambda_hz_per_publisher,
-                    duration_secs=args.duration_secs,
-                    seed=args.seed + i,
-                    out_dir=run_out,
-                )
-                subs = result.get("subscribers") or []
-                run_hist = Histogram(counts=[])
-                for sub in subs:
-                    run_hist = run_hist.merge(Histogram.from_json(sub.get("latency_hist")))
-            else:
-                raise AssertionError("unhandled scenario")
-
-            paths.write_json(f"raw/run-{i:02d}/result.json", result)
-
-            total_hist = total_hist.merge(run_hist)
-            per_run.append({"run": i, "latency": summarize_hist(run_hist)})
+        # registry, publishers and subscribers of one run; each pool worker
+        # runs one scenario at a time and inherits any raised limit. Past the
+        # limit, the resource monitor first gives up its per-pid stat fds.
+        agents = 1 + getattr(args, "publishers", 1) + getattr(args, "subscribers", 1)
+        fd_limit = raise_fd_limit(estimate_fds(agents))
+        stat_fds = keep_stat_fds(agents)
+        if fd_limit is not None and estimate_fds(agents, stat_fds=stat_fds) > fd_limit:
+            run.error(
+                f"{agents} agents need about {estimate_fds(agents, stat_fds=False)} open files, "
+                f"but RLIMIT_NOFILE is {fd_limit}; raise it with `ulimit -n`"
+            )
+
+        paths = RunPaths.create(args.results_dir, f"{args.scenario}-{run_id}", runs)
+        bins = Binaries(wind_registry=args.wind_registry, wind_agent=args.wind_agent)
 
         cfg = {
             k: (str(v) if isinstance(v, Path) else v)
             for k, v in vars(args).items()
         }
         cfg["scenario"] = args.scenario
+        if cpu_plan is not None:
+            cfg["cpu_plan"] = cpu_plan
         paths.write_json("config.json", cfg)
-        paths.write_json(
-            "summary.json",
-            {
-                "latency": summarize_hist(total_hist),
-                "per_run": per_run,
-            },
-        )
+
+        # scenario-invariant runner arguments; only seed/out_dir change per run
+        base_kwargs: dict[str, Any] = {name: getattr(args, name) for name in scenario.params}
+        base_kwargs["capture_stdout"] = args.capture_stdout
+        base_kwargs["cpu_plan"] = cpu_plan
+        if scenario.uses_services:
+            base_kwargs["services"] = [f"{args.service_prefix}/{j:04d}" for j in range(args.publishers)]
+
+        run_hists: list[Histogram] = []
+        per_run: list[dict[str, object]] = []
+
+        jobs: list[_Job] = []
+        for i in range(runs):
+            registry_addr = args.registry_addr if parallel == 1 else _replicate_addr(args.registry_addr, i)
+            jobs.append(
+                (args.scenario, bins, registry_addr, args.duration_secs, args.seed + i, paths.run_dir(i), base_kwargs)
+            )
+
+        # main() may run inside a larger program, so the harness's own mask
+        # is restored once the sweep is done
+        prev_cpus: set[int] | None = None
+        if cpu_plan is not None:
+            prev_cpus = os.sched_getaffinity(0)
+            # before any helper thread starts: the result writer, the sweep's
+            # resource sampler and the shared registry's drain thread all
+            # inherit this mask, keeping their work off the agents' CPUs
+            os.sched_setaffinity(0, cpu_plan["harness"])
+        try:
+            # every result.json is written by this writer thread alone, in the
+            # order the runs complete
+            write_q: queue.Queue[tuple[str, Any] | None] = queue.Queue()
+            write_errors: list[Exception] = []
+            writer = threading.Thread(target=_write_results, args=(write_q, paths, write_errors), daemon=True)
+            writer.start()
+
+            try:
+                with contextlib.ExitStack() as stack:
+                    monitor = None
+                    registry = None
+                    if parallel == 1:
+                        # one sampling thread for the whole sweep; pool workers are
+                        # separate processes and sample their own runs instead
+                        monitor = stack.enter_context(ResourceMonitor(interval_s=1.0, keep_stat_fds=stat_fds))
+                        if args.shared_registry:
+                            reg_cpus = cpu_plan.get("registry") if cpu_plan else None
+                            registry = stack.enter_context(
+                                shared_registry(bins, args.registry_addr, paths.raw_dir, reg_cpus)
+                            )
+
+                    for i, result, run_hist in _run_sweep(jobs, parallel=parallel, monitor=monitor, registry=registry):
+                        write_q.put((f"raw/run-{i:02d}/result.json", result))
+
+                        run_hists.append(run_hist)
+                        per_run.append({"run": i, "latency": summarize_hist(run_hist)})
+            finally:
+                write_q.put(None)
+                writer.join()
+            if write_errors:
+                raise write_errors[0]
+
+            # parallel sweeps hand runs back in completion order
+            per_run.sort(key=lambda r: r["run"])
+            total_hist = Histogram.merge_all(run_hists)
+
+            paths.write_json(
+                "summary.json",
+                {
+                    "latency": summarize_hist(total_hist),
+                    "per_run": per_run,
+                },
+            )
+        finally:
+            if prev_cpus is not None:
+                os.sched_setaffinity(0, prev_cpus)
 
         print(str(paths.root))
         return 0
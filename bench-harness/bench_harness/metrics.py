@@ -1,72 +1,204 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from itertools import accumulate, compress
+from typing import Any, Iterable
+
+# Fixed log-linear (circllhist-style) bin layout. Values below 10 get one exact
+# bin each; larger values are bucketed by their two leading decimal digits,
+# i.e. bin [m * 10**e, (m + 1) * 10**e) for m in 10..99. Nineteen decades cover
+# the whole u64 range agents can emit; anything larger lands in the last bin.
+_EXACT_BINS = 10
+_SUB_BUCKETS = 90
+_DECADES = 19
+BINS = _EXACT_BINS + _DECADES * _SUB_BUCKETS
+
+_POW10 = [10**e for e in range(_DECADES)]
+_BIN_MIDPOINTS = list(range(_EXACT_BINS)) + [
+    m * _POW10[e] + _POW10[e] // 2 for e in range(_DECADES) for m in range(10, 100)
+]
+
+
+def bin_index(value: int) -> int:
+    if value < _EXACT_BINS:
+        return value if value > 0 else 0
+    e = len(str(value)) - 2
+    if e >= _DECADES:
+        return BINS - 1
+    return _EXACT_BINS + e * _SUB_BUCKETS + value // _POW10[e] - 10
+
+
+# _BIN_LUT[v] == bin_index(v) for every 0 <= v < _LUT_SIZE (latencies below
+# ~65ms); each entry is a bin index, i.e. in _BIN_RANGE
+_LUT_SIZE = 1 << 16
+_BIN_LUT = array("H", map(bin_index, range(_LUT_SIZE)))
+_BIN_RANGE = range(BINS)
+
+
+def _zero_bins() -> array:
+    return array("q", bytes(8 * BINS))
 
 
 @dataclass(frozen=True)
 class Histogram:
-    # list of [latency_us, count]
-    counts: list[tuple[int, int]]
+    # dense per-bin counts in the fixed layout above, plus the exact extremes
+    counts: array = field(default_factory=_zero_bins)
+    lo: int | None = None
+    hi: int | None = None
 
     @staticmethod
     def from_json(obj: Any) -> "Histogram":
-        counts: list[tuple[int, int]] = []
-        for item in obj or []:
-            if not isinstance(item, list) or len(item) != 2:
-                continue
-            v, c = item
-            if not isinstance(v, int) or not isinstance(c, int):
-                continue
-            counts.append((v, c))
-        counts.sort(key=lambda x: x[0])
-        return Histogram(counts=counts)
-
-    def merge(self, other: "Histogram") -> "Histogram":
-        merged: dict[int, int] = {}
-        for v, c in self.counts:
-            merged[v] = merged.get(v, 0) + c
-        for v, c in other.counts:
-            merged[v] = merged.get(v, 0) + c
-        return Histogram(counts=sorted(merged.items(), key=lambda x: x[0]))
+        return Histogram.from_json_many((obj,))
+
+    @staticmethod
+    def from_json_many(objs: Iterable[Any]) -> "Histogram":
+        # the pairs of every input are binned into one HistogramAccumulator
+        acc = HistogramAccumulator()
+        for obj in objs:
+            acc.add_json(obj)
+        return acc.finalize()
+
+    @staticmethod
+    def merge_all(hists: Iterable["Histogram"]) -> "Histogram":
+        acc = HistogramAccumulator()
+        for h in hists:
+            acc.add_histogram(h)
+        return acc.finalize()
 
     def total(self) -> int:
-        return sum(c for _, c in self.counts)
+        return sum(self.counts)
 
     def min(self) -> int | None:
-        return None if not self.counts else self.counts[0][0]
+        return self.lo
 
     def max(self) -> int | None:
-        return None if not self.counts else self.counts[-1][0]
+        return self.hi
+
+    def value_at_quantiles(self, qs: Iterable[float]) -> list[int | None]:
+        # one cumulative sum shared by every requested quantile
+        qs = list(qs)
+        if self.lo is None:
+            return [None] * len(qs)
+
+        cum = list(accumulate(self.counts))
+        total = cum[-1]
+        out: list[int | None] = []
+        for q in qs:
+            if q <= 0.0:
+                out.append(self.lo)
+                continue
+            if q >= 1.0:
+                out.append(self.hi)
+                continue
+            target = int(total * q)
+            if target <= 0:
+                target = 1
+            mid = _BIN_MIDPOINTS[min(bisect_left(cum, target), BINS - 1)]
+            out.append(min(max(mid, self.lo), self.hi))
+        return out
+
+
+class HistogramAccumulator:
+    # Mutable counterpart of Histogram for hot loops: every add lands in one
+    # count buffer in place, and finalize() copies it out once.
+
+    def __init__(self) -> None:
+        self.counts = _zero_bins()
+        self.lo: int | None = None
+        self.hi: int | None = None
+
+    def _extend_range(self, lo: int, hi: int) -> None:
+        if self.lo is None or lo < self.lo:
+            self.lo = lo
+        if self.hi is None or hi > self.hi:
+            self.hi = hi
+
+    def add_json(self, obj: Any) -> None:
+        # agents emit [latency_us, count] pairs; re-bin them into the fixed layout
+        if not obj:
+            return
+        # Agents are trusted producers, so check the payload shape once in bulk
+        # and only fall back to per-item validation if that check fails.
+        try:
+            if not isinstance(obj[0], list):
+                raise TypeError("latency_hist items must be lists")
+            values = [v for v, _ in obj]
+            counts = [c for _, c in obj]
+        except (TypeError, ValueError, KeyError):
+            self._add_json_checked(obj)
+            return
+        if set(map(type, values)) != {int} or set(map(type, counts)) != {int}:
+            self._add_json_checked(obj)
+            return
+        if 0 in counts:
+            # zero-count entries carry no samples and must not widen lo/hi
+            values = [v for v, c in zip(values, counts) if c]
+            counts = [c for c in counts if c]
+            if not values:
+                return
+
+        bins = self.counts
+        lo, hi = min(values), max(values)
+        if lo >= 0 and hi < _LUT_SIZE:
+            lut = _BIN_LUT
+            for v, c in zip(values, counts):
+                bins[lut[v]] += c
+        else:
+            for v, c in zip(values, counts):
+                bins[bin_index(v)] += c
+        self._extend_range(lo, hi)
+
+    def _add_json_checked(self, obj: Any) -> None:
+        counts = self.counts
+        for item in obj or []:
+            if not isinstance(item, list) or len(item) != 2:
+                continue
+            v, c = item
+            if not isinstance(v, int) or not isinstance(c, int) or c == 0:
+                continue
+            counts[bin_index(v)] += c
+            self._extend_range(v, v)
+
+    def add_histogram(self, h: Histogram) -> None:
+        if h.lo is None:
+            return
+        # h.counts holds one count per bin in _BIN_RANGE, mostly zero;
+        # compress() yields the indexes of the nonzero ones
+        src = h.counts
+        counts = self.counts
+        for i in compress(_BIN_RANGE, src):
+            counts[i] += src[i]
+        self._extend_range(h.lo, h.hi)
 
-    def value_at_quantile(self, q: float) -> int | None:
-        if not self.counts:
-            return None
-        if q <= 0.0:
-            return self.counts[0][0]
-        if q >= 1.0:
-            return self.counts[-1][0]
+    def finalize(self) -> Histogram:
+        return Histogram(counts=array("q", self.counts), lo=self.lo, hi=self.hi)
 
-        target = int(self.total() * q)
-        if target <= 0:
-            target = 1
 
-        running = 0
-        for v, c in self.counts:
-            running += c
-            if running >= target:
-                return v
-        return self.counts[-1][0]
+_EMPTY_SUMMARY: dict[str, Any] = {
+    "count": 0,
+    "min_us": None,
+    "p50_us": None,
+    "p90_us": None,
+    "p95_us": None,
+    "p99_us": None,
+    "p999_us": None,
+    "max_us": None,
+}
 
 
 def summarize_hist(hist: Histogram) -> dict[str, Any]:
+    if hist.lo is None:
+        return dict(_EMPTY_SUMMARY)
+    p50, p90, p95, p99, p999 = hist.value_at_quantiles((0.50, 0.90, 0.95, 0.99, 0.999))
     return {
         "count": hist.total(),
         "min_us": hist.min(),
-        "p50_us": hist.value_at_quantile(0.50),
-        "p90_us": hist.value_at_quantile(0.90),
-        "p95_us": hist.value_at_quantile(0.95),
-        "p99_us": hist.value_at_quantile(0.99),
-        "p999_us": hist.value_at_quantile(0.999),
+        "p50_us": p50,
+        "p90_us": p90,
+        "p95_us": p95,
+        "p99_us": p99,
+        "p999_us": p999,
         "max_us": hist.max(),
     }
@@ -2,12 +2,27 @@ from __future__ import annotations
 
 import json
 import os
+import selectors
 import signal
 import subprocess
+import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Literal, Sequence
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib decoder
+    orjson = None
+
+try:
+    import resource
+except ImportError:  # not available on every platform
+    resource = None
 
 
 @dataclass(frozen=True)
@@ -16,22 +31,95 @@ class ProcResult:
     json_summary: dict[str, Any] | None
 
 
+_TAIL_CHUNK = 8192
+_LOG_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC
+_DRAIN_CHUNK = 65536
+_SUMMARY_CANDIDATES = 64
+# line an agent prints once it is ready to serve (see docs/benchmark_agents.md)
+READY_LINE = b"READY"
+_READY_POLL_S = 0.01
+_START_WORKERS = 32
+# how much of a "tail"-mode stdout is kept and written to its log at exit
+_TAIL_KEEP = 4096
+# Popen(process_group=) needs 3.11; older Pythons give each child its own session
+_POPEN_PROCESS_GROUP = sys.version_info >= (3, 11)
+
+# "file": full stdout in stdout_path; "tail": only the last _TAIL_KEEP bytes
+# end up there; "shared": every line, prefixed with log_prefix, is appended to
+# a log shared with other processes (shared_log_fd); "null": discarded.
+# READY_LINE detection and in-memory summary candidates need any mode but "null".
+CaptureMode = Literal["file", "null", "tail", "shared"]
+
+
+def fd_limit() -> int | None:
+    # the soft RLIMIT_NOFILE; None if there is no finite limit
+    if resource is None:
+        return None
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return None if soft == resource.RLIM_INFINITY else soft
+
+
+def raise_fd_limit(needed: int) -> int | None:
+    # Raise the soft RLIMIT_NOFILE to `needed`, capped at the hard limit, if
+    # it is lower; children inherit it. Returns the limit now in effect, as
+    # fd_limit() does.
+    soft = fd_limit()
+    if soft is None or soft >= needed:
+        return soft
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    except (ValueError, OSError):
+        pass
+    return fd_limit()
+
+
+def _parse_json_line(line: bytes) -> dict[str, Any] | None:
+    line = line.strip()
+    if not line.startswith(b"{"):
+        return None
+    try:
+        if orjson is not None:
+            obj = orjson.loads(line)
+        else:
+            obj = json.loads(line.decode("utf-8", errors="replace"))
+    except ValueError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    # os.write may write less than asked, e.g. when interrupted by a signal
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
 def _read_json_summary(stdout_path: Path) -> dict[str, Any] | None:
-    if not stdout_path.exists():
+    # The summary is the last JSON object an agent prints, so scan backwards
+    # from the end of the file instead of reading and splitting all of it.
+    try:
+        f = stdout_path.open("rb")
+    except OSError:
         return None
 
-    last_obj: dict[str, Any] | None = None
-    for line in stdout_path.read_text(encoding="utf-8", errors="replace").splitlines():
-        line = line.strip()
-        if not line.startswith("{"):
-            continue
-        try:
-            obj = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-        if isinstance(obj, dict):
-            last_obj = obj
-    return last_obj
+    with f:
+        pos = f.seek(0, os.SEEK_END)
+        partial = b""
+        while pos > 0:
+            step = min(_TAIL_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + partial).split(b"\n")
+            # unless we reached the start of the file, the first piece may be
+            # the tail end of a longer line; keep it for the next chunk
+            partial = lines.pop(0) if pos > 0 else b""
+            for line in reversed(lines):
+                obj = _parse_json_line(line)
+                if obj is not None:
+                    return obj
+    return None
 
 
 class ManagedProcess:
@@ -43,80 +131,353 @@ class ManagedProcess:
         cwd: Path | None,
         stdout_path: Path,
         stderr_path: Path,
+        capture_stdout: CaptureMode = "file",
+        # file the agent writes its summary to (--summary-path); preferred
+        # over stdout by result() when set
+        summary_path: Path | None = None,
+        # "shared" mode: an O_APPEND fd to write into, and the per-line prefix
+        shared_log_fd: int | None = None,
+        log_prefix: bytes = b"",
+        # CPUs the child (and every thread it starts) may run on; None: any
+        cpus: Sequence[int] | None = None,
+        # "file" mode: drain stdout through a pipe so wait_ready() sees
+        # READY_LINE as it is printed, at the cost of two fds held until exit
+        watch_ready: bool = False,
     ) -> None:
+        if capture_stdout == "shared" and shared_log_fd is None:
+            raise ValueError("capture_stdout='shared' needs a shared_log_fd")
         self.argv = argv
         self.env = env
         self.cwd = cwd
         self.stdout_path = stdout_path
         self.stderr_path = stderr_path
-        self._proc: subprocess.Popen[str] | None = None
+        self.capture_stdout = capture_stdout
+        self.summary_path = summary_path
+        self.shared_log_fd = shared_log_fd
+        self.log_prefix = log_prefix
+        self.cpus = cpus
+        self.watch_ready = watch_ready
+        self._stdout_str = str(stdout_path)
+        self._stderr_str = str(stderr_path)
+        self._cwd_str = str(cwd) if cwd else None
+        self._proc: subprocess.Popen[bytes] | None = None
+        self._drain_thread: threading.Thread | None = None
+        # process group signalled on teardown: its own, or the one it joined
+        self._pgid: int | None = None
+        # recent "{"-prefixed stdout lines, newest last; only filled in pipe mode
+        self._summary_lines: deque[bytes] = deque(maxlen=_SUMMARY_CANDIDATES)
+        # set when READY_LINE is seen or stdout closes; pipe mode only
+        self._ready = threading.Event()
+        self._ready_seen = False
+        # result() of an exited process, which cannot change any more
+        self._result: ProcResult | None = None
 
     @property
     def pid(self) -> int | None:
         return None if self._proc is None else self._proc.pid
 
-    def start(self) -> None:
-        self.stdout_path.parent.mkdir(parents=True, exist_ok=True)
-        self.stderr_path.parent.mkdir(parents=True, exist_ok=True)
+    def open_pidfd(self) -> int | None:
+        # readable once the child exits; None where pidfds are unavailable
+        if not hasattr(os, "pidfd_open") or self._proc is None:
+            return None
+        try:
+            return os.pidfd_open(self._proc.pid)
+        except OSError:
+            return None
+
+    def start(self, *, process_group: int | None = None) -> None:
+        # `process_group` is the pgid of a running process to join (so a whole
+        # scenario can be signalled at once); by default the child leads a new
+        # group of its own.
+        # Raw O_CLOEXEC fds: nothing in the harness buffers or translates the
+        # child's output on its way to disk. The caller creates the log
+        # directory.
+        if self.capture_stdout == "null":
+            stdout_fd = os.open(os.devnull, os.O_WRONLY | os.O_CLOEXEC)
+        elif self.capture_stdout == "shared":
+            # our own dup, so the drain thread can outlive the caller's fd
+            stdout_fd = os.dup(self.shared_log_fd)
+        else:
+            stdout_fd = os.open(self._stdout_str, _LOG_FLAGS, 0o644)
+        # every fd opened so far; all closed again if start() fails
+        opened = [stdout_fd]
+        prev_cpus: set[int] | None = None
+        try:
+            stderr_fd = os.open(self._stderr_str, _LOG_FLAGS, 0o644)
+            opened.append(stderr_fd)
+
+            # "tail" and "shared" children write stdout into a pipe that a
+            # background thread drains into the log, keeping the candidate
+            # summary lines in memory; so does a "file" child with watch_ready,
+            # where pipe2 exists. The pipe and the log fd stay open in the
+            # harness until the child exits, so any other "file" child writes
+            # its log directly (result() scans it backwards) and we keep no fds
+            # for it at all. "null" children never get a pipe.
+            pipe_r: int | None = None
+            child_stdout = stdout_fd
+            if self.capture_stdout in ("tail", "shared") or (
+                self.capture_stdout == "file" and self.watch_ready and hasattr(os, "pipe2")
+            ):
+                # non-inheritable either way (PEP 446); Popen dups it onto fd 1
+                pipe_r, child_stdout = os.pipe2(os.O_CLOEXEC) if hasattr(os, "pipe2") else os.pipe()
+                opened += (pipe_r, child_stdout)
+
+            # env=None lets the child inherit os.environ without a per-spawn copy
+            merged_env = None
+            if self.env:
+                merged_env = os.environ.copy()
+                merged_env.update(self.env)
+
+            # out of the harness's foreground group either way, so a terminal
+            # ^C reaches only the harness and teardown stays under its control
+            if _POPEN_PROCESS_GROUP:
+                group_kw: dict[str, Any] = {"process_group": process_group or 0}
+            else:
+                group_kw = {"start_new_session": True}
+                process_group = None
+
+            # A child inherits the affinity of the thread that forks it.
+            # Pinning the child by pid after exec would only cover its main
+            # thread, not the runtime threads it spawns immediately, so the
+            # spawning thread borrows the child's mask around Popen instead.
+            if self.cpus and hasattr(os, "sched_setaffinity"):
+                prev_cpus = os.sched_getaffinity(0)
+                os.sched_setaffinity(0, self.cpus)
 
-        stdout_f = self.stdout_path.open("w", encoding="utf-8")
-        stderr_f = self.stderr_path.open("w", encoding="utf-8")
+            self._proc = subprocess.Popen(
+                self.argv,
+                cwd=self._cwd_str,
+                env=merged_env,
+                stdout=child_stdout,
+                stderr=stderr_fd,
+                **group_kw,
+            )
+        except BaseException:
+            for fd in opened:
+                os.close(fd)
+            raise
+        finally:
+            if prev_cpus is not None:
+                os.sched_setaffinity(0, prev_cpus)
+        # the child has its own copies now; the drain thread owns the rest
+        os.close(child_stdout)
+        os.close(stderr_fd)
+        self._pgid = process_group or self._proc.pid
 
-        merged_env = os.environ.copy()
-        if self.env:
-            merged_env.update(self.env)
+        if pipe_r is not None:
+            self._drain_thread = threading.Thread(
+                target=self._drain, args=(pipe_r, stdout_fd), daemon=True
+            )
+            self._drain_thread.start()
 
-        self._proc = subprocess.Popen(
-            self.argv,
-            cwd=str(self.cwd) if self.cwd else None,
-            env=merged_env,
-            stdout=stdout_f,
-            stderr=stderr_f,
-            text=True,
-        )
+    def _drain(self, pipe_r: int, log_fd: int) -> None:
+        mode = self.capture_stdout
+        prefix = self.log_prefix
+        candidates = self._summary_lines
+        # pieces of the current, not yet terminated line; only joined once its
+        # newline arrives, so a long line is not re-copied on every read
+        pending: list[bytes] = []
+        tail = bytearray()
+        with open(pipe_r, "rb", buffering=0) as pipe, open(log_fd, "wb") as log:
+            while True:
+                chunk = pipe.read(_DRAIN_CHUNK)
+                if not chunk:
+                    break
+                if mode == "file":
+                    log.write(chunk)
+                elif mode == "tail":
+                    tail += chunk
+                    if len(tail) > _TAIL_KEEP:
+                        del tail[:-_TAIL_KEEP]
+                end = chunk.rfind(b"\n")
+                if end < 0:
+                    pending.append(chunk)
+                    continue
+                pending.append(chunk[:end])
+                lines = b"".join(pending).split(b"\n")
+                pending = [chunk[end + 1 :]]
+                if mode == "shared":
+                    # whole prefixed lines in one write: O_APPEND places each
+                    # write atomically, so agents never interleave mid-line
+                    _write_all(log_fd, b"".join([prefix + line + b"\n" for line in lines]))
+                for line in lines:
+                    stripped = line.strip()
+                    if stripped.startswith(b"{"):
+                        candidates.append(line)
+                    elif stripped == READY_LINE and not self._ready_seen:
+                        self._ready_seen = True
+                        self._ready.set()
+            partial = b"".join(pending)
+            if mode == "tail":
+                log.write(tail)
+            elif mode == "shared" and partial:
+                _write_all(log_fd, prefix + partial + b"\n")
+        if partial.lstrip().startswith(b"{"):
+            candidates.append(partial)
+        self._ready.set()
+
+    def wait_ready(self, *, timeout_secs: float) -> bool:
+        # whether READY_LINE was printed before stdout closed or the timeout
+        if self._drain_thread is not None:
+            self._ready.wait(timeout_secs)
+            return self._ready_seen
+
+        # file mode: nothing to wake us, so re-read the log briefly
+        deadline = time.monotonic() + timeout_secs
+        while True:
+            try:
+                lines = self.stdout_path.read_bytes().splitlines()
+            except OSError:
+                lines = []
+            if any(line.strip() == READY_LINE for line in lines):
+                return True
+            if self.poll() is not None or time.monotonic() >= deadline:
+                return False
+            time.sleep(_READY_POLL_S)
 
     def poll(self) -> int | None:
         if not self._proc:
             return None
         return self._proc.poll()
 
-    def terminate(self, *, timeout_secs: float = 5.0) -> None:
-        if not self._proc:
+    def _signal(self, sig: signal.Signals, *, group: bool = False) -> None:
+        # group=True signals the whole process group this child is in, which
+        # may hold other ManagedProcesses that joined it
+        if self._proc is None or self._pgid is None:
             return
-
-        if self._proc.poll() is not None:
-            return
-
         try:
-            os.kill(self._proc.pid, signal.SIGTERM)
+            if group:
+                os.killpg(self._pgid, sig)
+            else:
+                os.kill(self._proc.pid, sig)
         except ProcessLookupError:
-            return
-
-        deadline = time.time() + timeout_secs
-        while time.time() < deadline:
-            if self._proc.poll() is not None:
-                return
-            time.sleep(0.05)
+            pass
 
-        try:
-            os.kill(self._proc.pid, signal.SIGKILL)
-        except ProcessLookupError:
-            return
+    def terminate(self, *, timeout_secs: float = 5.0) -> None:
+        terminate_all((self,), timeout_secs=timeout_secs)
 
     def wait(self, *, timeout_secs: float | None = None) -> int:
         if not self._proc:
             raise RuntimeError("process not started")
         return self._proc.wait(timeout=timeout_secs)
 
+    def _stdout_summary(self, *, exited: bool) -> dict[str, Any] | None:
+        if self._drain_thread is None:
+            if self.capture_stdout == "null":
+                return None
+            return _read_json_summary(self.stdout_path)
+        if exited:
+            # wait for the tail of its output to be drained
+            self._drain_thread.join(timeout=5.0)
+        for line in reversed(list(self._summary_lines)):
+            summary = _parse_json_line(line)
+            if summary is not None:
+                return summary
+        return None
+
     def result(self) -> ProcResult:
+        if self._result is not None:
+            return self._result
+
         rc = -1
         if self._proc is not None and self._proc.poll() is not None:
             rc = int(self._proc.returncode or 0)
 
-        summary = _read_json_summary(self.stdout_path)
-        return ProcResult(returncode=rc, json_summary=summary)
+        summary = None
+        if self.summary_path is not None and rc != -1:
+            summary = _read_json_summary(self.summary_path)
+        if summary is None:
+            summary = self._stdout_summary(exited=rc != -1)
+        res = ProcResult(returncode=rc, json_summary=summary)
+        if rc != -1:
+            self._result = res
+        return res
+
+
+def start_all(
+    processes: Sequence[ManagedProcess],
+    *,
+    max_workers: int = _START_WORKERS,
+    process_group: int | None = None,
+) -> None:
+    # Popen blocks in vfork/exec until the child is running, so a thread pool
+    # overlaps those waits across cores; on one core it only adds contention.
+    # Start order is not meaningful to the agents.
+    workers = min(max_workers, len(processes), os.cpu_count() or 1)
+    if workers <= 1:
+        for proc in processes:
+            proc.start(process_group=process_group)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(lambda proc: proc.start(process_group=process_group), processes):
+            pass
+
+
+def wait_all(processes: Iterable[ManagedProcess], *, timeout_secs: float) -> None:
+    # Popen.wait covers children we could not get a pidfd for (e.g. EMFILE)
+    deadline = time.monotonic() + timeout_secs
+    pending = [p for p in processes if p.poll() is None and p._proc is not None]
+    fallback: list[ManagedProcess] = []
 
+    try:
+        sel = selectors.DefaultSelector()
+    except OSError:
+        sel = None
+        fallback = list(pending)
 
-def terminate_all(processes: Iterable[ManagedProcess]) -> None:
+    if sel is not None:
+        with sel:
+            try:
+                for proc in pending:
+                    pidfd = proc.open_pidfd()
+                    if pidfd is None:
+                        fallback.append(proc)
+                        continue
+                    try:
+                        sel.register(pidfd, selectors.EVENT_READ, proc)
+                    except OSError:
+                        os.close(pidfd)
+                        fallback.append(proc)
+                while sel.get_map():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"{len(sel.get_map())} process(es) still running after {timeout_secs}s")
+                    for key, _ in sel.select(remaining):
+                        key.data.poll()  # reap it
+                        sel.unregister(key.fd)
+                        os.close(key.fd)
+            finally:
+                for key in list(sel.get_map().values()):
+                    sel.unregister(key.fd)
+                    os.close(key.fd)
+
+    for proc in fallback:
+        try:
+            proc.wait(timeout_secs=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            raise TimeoutError(f"process {proc.pid} still running after {timeout_secs}s") from None
+
+
+def _signal_all(processes: Iterable[ManagedProcess], sig: signal.Signals, *, whole_groups: bool) -> None:
+    if whole_groups:
+        # one killpg per distinct group; it also reaches every other member
+        processes = {p._pgid: p for p in processes}.values()
     for proc in processes:
-        proc.terminate()
+        proc._signal(sig, group=whole_groups)
+
+
+def terminate_all(
+    processes: Iterable[ManagedProcess], *, timeout_secs: float = 5.0, whole_groups: bool = False
+) -> None:
+    # SIGTERM every live process, then wait on their pidfds under one deadline
+    # before escalating to SIGKILL. With whole_groups, each distinct process
+    # group is signalled once instead (a scenario sharing one group goes down
+    # with a single killpg), taking any other members of it down too; only
+    # use it to tear down everything in those groups.
+    live = [p for p in processes if p.poll() is None and p._proc is not None]
+    _signal_all(live, signal.SIGTERM, whole_groups=whole_groups)
+    try:
+        wait_all(live, timeout_secs=timeout_secs)
+    except TimeoutError:
+        pass
+    _signal_all([p for p in live if p.poll() is None], signal.SIGKILL, whole_groups=whole_groups)
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
 import os
+import threading
 import time
 from dataclasses import dataclass
 from typing import Any
 
+_CLK_TCK = os.sysconf("SC_CLK_TCK")
+_PAGESIZE = os.sysconf("SC_PAGESIZE")
+_PAGE_KB = _PAGESIZE // 1024
+
+_STAT_READ = 4096
+
 
 @dataclass(frozen=True)
 class ProcSample:
@@ -14,73 +21,172 @@ class ProcSample:
     stime_ticks: int | None
 
 
-def _read_file(path: str) -> str | None:
+def _parse_stat(t_s: float, stat: bytes | bytearray, end: int) -> ProcSample:
+    # comm (field 2) may contain spaces or parens, so split after the last ")";
+    # tail[0] is then field 3 (state) and utime/stime/rss are fields 14/15/24
+    tail = stat[stat.rfind(b")", 0, end) + 1 : end].split()
+    if len(tail) < 22:
+        return ProcSample(t_s=t_s, rss_kb=None, utime_ticks=None, stime_ticks=None)
+    try:
+        return ProcSample(
+            t_s=t_s,
+            rss_kb=int(tail[21]) * _PAGE_KB,
+            utime_ticks=int(tail[11]),
+            stime_ticks=int(tail[12]),
+        )
+    except ValueError:
+        return ProcSample(t_s=t_s, rss_kb=None, utime_ticks=None, stime_ticks=None)
+
+
+def _open_stat(pid: int) -> int | None:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
+        return os.open(f"/proc/{pid}/stat", os.O_RDONLY | os.O_CLOEXEC)
     except OSError:
         return None
 
 
-def sample_proc(pid: int) -> ProcSample:
+def _sample_fd(fd: int | None, buf: bytearray) -> ProcSample:
     t_s = time.monotonic()
-
-    rss_kb: int | None = None
-    status = _read_file(f"/proc/{pid}/status")
-    if status:
-        for line in status.splitlines():
-            if line.startswith("VmRSS:"):
-                parts = line.split()
-                if len(parts) >= 2:
-                    try:
-                        rss_kb = int(parts[1])
-                    except ValueError:
-                        rss_kb = None
-                break
-
-    utime_ticks: int | None = None
-    stime_ticks: int | None = None
-    stat = _read_file(f"/proc/{pid}/stat")
-    if stat:
-        parts = stat.split()
-        if len(parts) > 15:
-            try:
-                utime_ticks = int(parts[13])
-                stime_ticks = int(parts[14])
-            except ValueError:
-                utime_ticks = None
-                stime_ticks = None
-
-    return ProcSample(t_s=t_s, rss_kb=rss_kb, utime_ticks=utime_ticks, stime_ticks=stime_ticks)
-
-
-def collect_while(
-    *,
-    pids: list[int],
-    should_continue: callable[[], bool],
-    interval_s: float = 0.5,
-) -> dict[int, list[dict[str, Any]]]:
-    out: dict[int, list[dict[str, Any]]] = {pid: [] for pid in pids}
-
-    while should_continue():
+    if fd is None:
+        return ProcSample(t_s=t_s, rss_kb=None, utime_ticks=None, stime_ticks=None)
+    try:
+        n = os.preadv(fd, (buf,), 0)
+    except OSError:
+        return ProcSample(t_s=t_s, rss_kb=None, utime_ticks=None, stime_ticks=None)
+    return _parse_stat(t_s, buf, n)
+
+
+class ProcStatReader:
+    # /proc/<pid>/stat supports pread from offset 0, so one fd per pid stays
+    # open for the reader's lifetime instead of being reopened every sample,
+    # and every pid is read into the same scratch buffer. With keep_open=False
+    # each sample opens and closes its own fd instead, for pid sets too large
+    # to hold an fd each.
+
+    def __init__(self, pids: list[int], *, keep_open: bool = True) -> None:
+        self._buf = bytearray(_STAT_READ)
+        self._keep_open = keep_open
+        # pid -> its open stat fd; None if it failed to open or !keep_open
+        self._fds: dict[int, int | None] = {}
         for pid in pids:
-            s = sample_proc(pid)
-            out[pid].append(
-                {
-                    "t_s": s.t_s,
-                    "rss_kb": s.rss_kb,
-                    "utime_ticks": s.utime_ticks,
-                    "stime_ticks": s.stime_ticks,
-                }
-            )
-        time.sleep(interval_s)
+            self.add(pid)
+
+    def __enter__(self) -> "ProcStatReader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def add(self, pid: int) -> None:
+        if pid not in self._fds:
+            self._fds[pid] = _open_stat(pid) if self._keep_open else None
+
+    def discard(self, pid: int) -> None:
+        fd = self._fds.pop(pid, None)
+        if fd is not None:
+            os.close(fd)
+
+    def sample(self, pid: int) -> ProcSample:
+        if self._keep_open:
+            return _sample_fd(self._fds.get(pid), self._buf)
+        fd = _open_stat(pid)
+        try:
+            return _sample_fd(fd, self._buf)
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def sample_row(self, pid: int) -> dict[str, Any]:
+        s = self.sample(pid)
+        return {
+            "t_s": s.t_s,
+            "rss_kb": s.rss_kb,
+            "utime_ticks": s.utime_ticks,
+            "stime_ticks": s.stime_ticks,
+        }
 
-    return out
+    def close(self) -> None:
+        fds, self._fds = self._fds, {}
+        for fd in fds.values():
+            if fd is not None:
+                os.close(fd)
+
+
+class ResourceMonitor:
+    # One sampling thread for a whole sweep. Each scenario registers its pids
+    # with enter() and takes back exactly the rows collected for them with
+    # leave(), as {pid: [row, ...]} for summarize_samples.
+
+    def __init__(self, *, interval_s: float = 1.0, keep_stat_fds: bool = True) -> None:
+        self._interval_s = interval_s
+        # keep_stat_fds=False: reopen /proc/<pid>/stat every tick rather than
+        # hold an fd per registered pid
+        self._reader = ProcStatReader([], keep_open=keep_stat_fds)
+        self._lock = threading.Lock()
+        self._groups: dict[int, dict[int, list[dict[str, Any]]]] = {}
+        self._next_id = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> "ResourceMonitor":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def enter(self, pids: list[int]) -> int:
+        with self._lock:
+            group_id = self._next_id
+            self._next_id += 1
+            rows: dict[int, list[dict[str, Any]]] = {pid: [] for pid in pids}
+            # sample once right away so even a scenario shorter than one
+            # interval gets a row per pid
+            for pid in pids:
+                self._reader.add(pid)
+                rows[pid].append(self._reader.sample_row(pid))
+            self._groups[group_id] = rows
+        return group_id
+
+    def leave(self, group_id: int) -> dict[int, list[dict[str, Any]]]:
+        with self._lock:
+            rows = self._groups.pop(group_id)
+            still_used = {pid for group in self._groups.values() for pid in group}
+            for pid in rows:
+                if pid not in still_used:
+                    self._reader.discard(pid)
+        return rows
+
+    def _run(self) -> None:
+        # deadline-driven so the sampling cost does not stretch the period;
+        # after an overrun, resume from now rather than bursting to catch up
+        next_t = time.monotonic() + self._interval_s
+        while not self._stop.wait(max(0.0, next_t - time.monotonic())):
+            next_t += self._interval_s
+            with self._lock:
+                for rows in self._groups.values():
+                    for pid, pid_rows in rows.items():
+                        pid_rows.append(self._reader.sample_row(pid))
+            now = time.monotonic()
+            if now >= next_t:
+                next_t = now
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._reader.close()
 
 
 def summarize_samples(samples: dict[int, list[dict[str, Any]]]) -> dict[str, Any]:
-    clk_tck = os.sysconf(os.sysconf_names.get("SC_CLK_TCK", "SC_CLK_TCK"))
-    summary: dict[str, Any] = {"clk_tck": clk_tck, "processes": {}}
+    summary: dict[str, Any] = {"clk_tck": _CLK_TCK, "processes": {}}
 
     for pid, rows in samples.items():
         max_rss = None
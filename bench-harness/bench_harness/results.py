@@ -5,6 +5,20 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(obj, indent=2, sort_keys=True).encode("utf-8")
+
 
 @dataclass(frozen=True)
 class RunPaths:
@@ -12,14 +26,21 @@ class RunPaths:
     raw_dir: Path
 
     @staticmethod
-    def create(base_dir: Path, run_id: str) -> "RunPaths":
+    def create(base_dir: Path, run_id: str, runs: int = 0) -> "RunPaths":
         root = base_dir / run_id
         raw_dir = root / "raw"
         raw_dir.mkdir(parents=True, exist_ok=True)
-        return RunPaths(root=root, raw_dir=raw_dir)
+        paths = RunPaths(root=root, raw_dir=raw_dir)
+        # plus raw/run-NN for each of the first `runs` runs
+        for i in range(runs):
+            paths.run_dir(i).mkdir(exist_ok=True)
+        return paths
+
+    def run_dir(self, i: int) -> Path:
+        return self.raw_dir / f"run-{i:02d}"
 
     def write_json(self, rel: str, obj: Any) -> Path:
         path = self.root / rel
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(obj, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        path.write_bytes(_dumps(obj) + b"\n")
         return path
@@ -1,41 +1,426 @@
 from __future__ import annotations
 
+import contextlib
+import errno
+import functools
+import os
+import selectors
+import socket
+import subprocess
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, Sequence
 
 from .metrics import Histogram, summarize_hist
-from .proc import ManagedProcess, terminate_all
-from .resources import collect_while, summarize_samples
+from .proc import CaptureMode, ManagedProcess, fd_limit, start_all, terminate_all, wait_all
+from .resources import ResourceMonitor, summarize_samples
+
+
+CpuPlan = dict[str, tuple[int, ...]]
+
+
+def default_cpu_plan() -> CpuPlan | None:
+    # Disjoint CPU sets so harness work (log draining, JSON parsing, resource
+    # sampling) and the registry do not land on the agents' cores: one CPU
+    # each for the harness and registry, the rest split between publishers
+    # and subscribers. None when fewer than 4 CPUs are available to us.
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < 4:
+        return None
+    agents = cpus[1:-1]
+    half = len(agents) // 2
+    return {
+        "registry": (cpus[0],),
+        "publishers": tuple(agents[:half]),
+        "subscribers": tuple(agents[half:]),
+        "harness": (cpus[-1],),
+    }
 
 
 @dataclass(frozen=True)
 class Binaries:
     wind_registry: Path
     wind_agent: Path
+    wind_registry_s: str = field(init=False, repr=False, compare=False)
+    wind_agent_s: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "wind_registry_s", str(self.wind_registry))
+        object.__setattr__(self, "wind_agent_s", str(self.wind_agent))
+
+
+@dataclass(frozen=True)
+class PubSpec:
+    service: str
+    mode: str
+    hz: float
+    payload_bytes: int
+    seed: int
+    # log file stem under out_dir, e.g. "publisher" or "publisher-0003"
+    log_name: str
+    payload_profile: str | None = None
+
 
+@dataclass(frozen=True)
+class SubSpec:
+    services: tuple[str, ...]
+    log_name: str
 
-def _wait_for_registry(registry_addr: str, timeout_secs: float = 5.0) -> None:
-    # best-effort: registry is a TCP listener; we just sleep briefly
-    deadline = time.time() + timeout_secs
-    while time.time() < deadline:
-        time.sleep(0.1)
-        return
 
+@dataclass(frozen=True)
+class ScenarioSpec:
+    registry_addr: str
+    duration_secs: int
+    pubs: tuple[PubSpec, ...]
+    subs: tuple[SubSpec, ...]
+    # report every subscriber under "subscribers" (fan-out) rather than the
+    # single one under "subscriber"
+    multi_subscriber: bool
+    # subscriber stdout handling; publishers keep "file" (the harness reads
+    # their READY line from it) unless everything goes to one "shared" log
+    capture_stdout: CaptureMode = "file"
+    # CPUs per role ("registry", "publishers", "subscribers", "harness"); a
+    # missing role runs unpinned. None: leave placement to the scheduler.
+    cpu_plan: CpuPlan | None = None
+
+
+# Parent-side fds one agent may hold while its scenario runs: a stdout drain
+# pipe and log fd (publishers; "tail"/"shared" subscribers), its pidfd in
+# wait_all and the resource monitor's /proc/<pid>/stat fd.
+FDS_PER_AGENT = 4
+# the harness's own: stdio, imports, selectors, result files, shared log
+_FD_HEADROOM = 64
+
+
+def estimate_fds(agents: int, *, stat_fds: bool = True) -> int:
+    # upper bound on the fds one run with `agents` processes needs at once;
+    # stat_fds=False: the monitor reopens /proc/<pid>/stat every tick instead
+    per_agent = FDS_PER_AGENT if stat_fds else FDS_PER_AGENT - 1
+    return agents * per_agent + _FD_HEADROOM
+
+
+def keep_stat_fds(agents: int) -> bool:
+    # whether a ResourceMonitor can hold a stat fd per agent within our limit
+    limit = fd_limit()
+    return limit is None or estimate_fds(agents) <= limit
+
+
+_CONNECT_RETRY_S = 0.01
+_SHARED_LOG_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND | os.O_CLOEXEC
+
+
+def _wait_for_registry(registry_addr: str, reg: ManagedProcess, timeout_secs: float = 5.0) -> None:
+    # Event-driven readiness: retry a non-blocking connect until the registry
+    # accepts, with its pidfd in the same selector so a crash wakes us at once.
+    host, _, port = registry_addr.rpartition(":")
+    family, socktype, proto, _, sockaddr = socket.getaddrinfo(
+        host.strip("[]"), int(port), type=socket.SOCK_STREAM
+    )[0]
+    deadline = time.monotonic() + timeout_secs
+    pidfd = reg.open_pidfd()
+
+    with selectors.DefaultSelector() as sel:
+        if pidfd is not None:
+            sel.register(pidfd, selectors.EVENT_READ)
+        try:
+            while True:
+                with socket.socket(family, socktype, proto) as sock:
+                    sock.setblocking(False)
+                    err = sock.connect_ex(sockaddr)
+                    if err == errno.EINPROGRESS:
+                        key = sel.register(sock, selectors.EVENT_WRITE)
+                        ready = sel.select(max(0.0, deadline - time.monotonic()))
+                        sel.unregister(sock)
+                        if any(k.fd == key.fd for k, _ in ready):
+                            err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if err == 0:
+                        return
+
+                rc = reg.poll()
+                if rc is not None:
+                    raise RuntimeError(f"registry exited with code {rc} before accepting connections")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"registry at {registry_addr} not accepting connections after {timeout_secs}s")
+                # not listening yet: back off briefly, waking early if it dies
+                sel.select(min(_CONNECT_RETRY_S, remaining))
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+
+
+def _wait_for_publishers(publishers: list[ManagedProcess], timeout_secs: float = 5.0) -> None:
+    # publishers start concurrently, so one shared deadline covers all of them
+    deadline = time.monotonic() + timeout_secs
+    for pub in publishers:
+        if pub.wait_ready(timeout_secs=max(0.0, deadline - time.monotonic())):
+            continue
+        # stdout closing usually means the agent is exiting; give it a moment
+        # to be reaped so the error names the exit code
+        try:
+            rc = pub.wait(timeout_secs=0.1)
+        except subprocess.TimeoutExpired:
+            raise TimeoutError(f"publisher not ready after {timeout_secs}s") from None
+        raise RuntimeError(f"publisher exited with code {rc} before reporting ready")
+
+
+def _start_registry(
+    bins: Binaries, registry_addr: str, out_dir: Path, cpus: Sequence[int] | None = None
+) -> ManagedProcess:
+    reg = _log_process([bins.wind_registry_s, "--bind", registry_addr], out_dir, "registry", cpus=cpus)
+    reg.start()
+    try:
+        _wait_for_registry(registry_addr, reg)
+    except BaseException:
+        terminate_all((reg,))
+        raise
+    return reg
+
+
+@contextlib.contextmanager
+def shared_registry(
+    bins: Binaries, registry_addr: str, out_dir: Path, cpus: Sequence[int] | None = None
+) -> Iterator[ManagedProcess]:
+    # One registry for a whole sweep, passed to the runners as `registry`.
+    # Publishers re-register their service name on startup, overwriting any
+    # entry left by the previous scenario, so reuse never routes a subscriber
+    # to a stale publisher.
+    out_dir.mkdir(parents=True, exist_ok=True)
+    reg = _start_registry(bins, registry_addr, out_dir, cpus)
+    try:
+        yield reg
+    finally:
+        terminate_all((reg,))
 
-def _subscriber_services_args(services: list[str]) -> list[str]:
+
+@functools.lru_cache(maxsize=256)
+def _subscriber_services_args(services: tuple[str, ...]) -> tuple[str, ...]:
+    # fan-in subscribers cycle through a handful of distinct service windows,
+    # so most calls are cache hits
     argv: list[str] = []
     for svc in services:
-        argv.extend(["--service", svc])
-    return argv
+        argv.extend(("--service", svc))
+    return tuple(argv)
 
 
 def _merge_subscriber_hists(sub_summaries: list[dict[str, Any]]) -> Histogram:
-    merged = Histogram(counts=[])
-    for sub in sub_summaries:
-        merged = merged.merge(Histogram.from_json(sub.get("latency_hist")))
-    return merged
+    return Histogram.from_json_many(sub.get("latency_hist") for sub in sub_summaries)
+
+
+def _publisher_argv_template(bins: Binaries, registry_addr: str, duration_arg: str, spec: PubSpec) -> tuple[str, ...]:
+    # everything but --service/--seed, which are the per-publisher fields
+    argv = [
+        bins.wind_agent_s,
+        "publisher",
+        "--registry",
+        registry_addr,
+        "--duration-secs",
+        duration_arg,
+        "--mode",
+        spec.mode,
+        "--hz",
+        str(spec.hz),
+        "--payload-bytes",
+        str(spec.payload_bytes),
+    ]
+    if spec.payload_profile is not None:
+        argv.extend(["--payload-profile", spec.payload_profile])
+    return tuple(argv)
+
+
+def _build_publisher_argvs(
+    bins: Binaries, registry_addr: str, duration_arg: str, pubs: tuple[PubSpec, ...]
+) -> list[list[str]]:
+    # publishers in a scenario normally share mode/rate/payload, so build the
+    # invariant part once per distinct combination and only append the rest
+    templates: dict[tuple[str, float, int, str | None], tuple[str, ...]] = {}
+    out = []
+    for spec in pubs:
+        key = (spec.mode, spec.hz, spec.payload_bytes, spec.payload_profile)
+        template = templates.get(key)
+        if template is None:
+            template = templates[key] = _publisher_argv_template(bins, registry_addr, duration_arg, spec)
+        out.append([*template, "--service", spec.service, "--seed", str(spec.seed)])
+    return out
+
+
+def _subscriber_argv_head(bins: Binaries, registry_addr: str, duration_arg: str) -> tuple[str, ...]:
+    # identical for every subscriber in a scenario; only --service flags differ
+    return (bins.wind_agent_s, "subscriber", "--registry", registry_addr, "--duration-secs", duration_arg)
+
+
+def _build_subscriber_argv(head: tuple[str, ...], spec: SubSpec, summary_path: Path | None = None) -> list[str]:
+    argv = [*head, *_subscriber_services_args(spec.services)]
+    if summary_path is not None:
+        argv.extend(["--summary-path", str(summary_path)])
+    return argv
+
+
+def _log_process(
+    argv: list[str],
+    out_dir: Path,
+    log_name: str,
+    *,
+    capture_stdout: CaptureMode = "file",
+    summary_path: Path | None = None,
+    shared_log_fd: int | None = None,
+    cpus: Sequence[int] | None = None,
+    watch_ready: bool = False,
+) -> ManagedProcess:
+    return ManagedProcess(
+        argv=argv,
+        env=None,
+        cwd=None,
+        stdout_path=out_dir / f"{log_name}.stdout.log",
+        stderr_path=out_dir / f"{log_name}.stderr.log",
+        capture_stdout=capture_stdout,
+        summary_path=summary_path,
+        shared_log_fd=shared_log_fd,
+        log_prefix=f"[{log_name}] ".encode(),
+        cpus=cpus,
+        watch_ready=watch_ready,
+    )
+
+
+def _subscriber_process(
+    head: tuple[str, ...],
+    spec: SubSpec,
+    out_dir: Path,
+    capture_stdout: CaptureMode,
+    shared_log_fd: int | None,
+    cpus: Sequence[int] | None = None,
+) -> ManagedProcess:
+    # "tail"/"null" lose the stdout summary line, so it comes from --summary-path
+    summary_path = None if capture_stdout in ("file", "shared") else out_dir / f"{spec.log_name}.json"
+    return _log_process(
+        _build_subscriber_argv(head, spec, summary_path),
+        out_dir,
+        spec.log_name,
+        capture_stdout=capture_stdout,
+        summary_path=summary_path,
+        shared_log_fd=shared_log_fd,
+        cpus=cpus,
+    )
+
+
+def _run_scenario(
+    spec: ScenarioSpec,
+    *,
+    bins: Binaries,
+    out_dir: Path,
+    monitor: ResourceMonitor | None = None,
+    registry: ManagedProcess | None = None,
+) -> tuple[dict[str, Any], Histogram]:
+    # registry -> publishers (wait for READY) -> subscribers; sample resources
+    # until every subscriber exits, then tear down. Everything started here
+    # joins one process group led by our registry, so teardown is one killpg.
+    # A caller-owned `registry` is sampled like ours but never torn down here;
+    # the first publisher leads the group instead.
+    # Returns the result along with the merged subscriber histogram, so
+    # callers need not re-bin it from the result's latency_hist pairs.
+    # With a cpu_plan, this thread (and the threads it starts) is pinned to the
+    # "harness" CPUs for the scenario and each child to its role's CPUs.
+    registry_addr = spec.registry_addr
+    duration_secs = spec.duration_secs
+    duration_arg = str(duration_secs)
+    procs: list[ManagedProcess] = []
+    # the log directory of every process below
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # "shared": publishers and subscribers all append to one scenario.log
+    shared_log_fd: int | None = None
+    if spec.capture_stdout == "shared":
+        shared_log_fd = os.open(out_dir / "scenario.log", _SHARED_LOG_FLAGS, 0o644)
+    pub_capture: CaptureMode = "shared" if shared_log_fd is not None else "file"
+    plan = spec.cpu_plan or {}
+    prev_cpus: set[int] | None = None
+    try:
+        if plan.get("harness"):
+            prev_cpus = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, plan["harness"])
+        pgid: int | None = None
+        if registry is None:
+            registry = _start_registry(bins, registry_addr, out_dir, plan.get("registry"))
+            procs.append(registry)
+            pgid = registry.pid
+        elif registry.poll() is not None:
+            raise RuntimeError(f"shared registry exited with code {registry.poll()}")
+
+        # build every process up front, then spawn the whole tier concurrently;
+        # they join procs first so teardown covers any that did start
+        pub_argvs = _build_publisher_argvs(bins, registry_addr, duration_arg, spec.pubs)
+        publishers = [
+            _log_process(
+                argv,
+                out_dir,
+                s.log_name,
+                capture_stdout=pub_capture,
+                shared_log_fd=shared_log_fd,
+                cpus=plan.get("publishers"),
+                watch_ready=True,
+            )
+            for argv, s in zip(pub_argvs, spec.pubs)
+        ]
+        procs.extend(publishers)
+        if pgid is None and publishers:
+            publishers[0].start()
+            pgid = publishers[0].pid
+            start_all(publishers[1:], process_group=pgid)
+        else:
+            start_all(publishers, process_group=pgid)
+
+        _wait_for_publishers(publishers)
+
+        sub_head = _subscriber_argv_head(bins, registry_addr, duration_arg)
+        sub_cpus = plan.get("subscribers")
+        sub_procs = [
+            _subscriber_process(sub_head, s, out_dir, spec.capture_stdout, shared_log_fd, sub_cpus) for s in spec.subs
+        ]
+        procs.extend(sub_procs)
+        start_all(sub_procs, process_group=pgid)
+
+        sampled = procs if registry in procs else [registry, *procs]
+        pids = [int(p.pid) for p in sampled if p.pid is not None]
+        # Without a sweep-wide monitor, this run gets a private one.
+        with contextlib.ExitStack() as stack:
+            if monitor is None:
+                monitor = stack.enter_context(
+                    ResourceMonitor(interval_s=1.0, keep_stat_fds=keep_stat_fds(len(pids)))
+                )
+            group = monitor.enter(pids)
+            try:
+                wait_all(sub_procs, timeout_secs=duration_secs + 10)
+            finally:
+                samples = monitor.leave(group)
+
+        terminate_all(publishers)
+
+        subs = [p.result().json_summary or {} for p in sub_procs]
+        merged_hist = _merge_subscriber_hists(subs)
+        out: dict[str, Any] = {"subscribers": subs} if spec.multi_subscriber else {"subscriber": subs[0]}
+        out["latency"] = summarize_hist(merged_hist)
+        out["resources"] = summarize_samples(samples)
+        return out, merged_hist
+    finally:
+        # everything here shares the group, so this is one killpg
+        terminate_all(procs, whole_groups=True)
+        if shared_log_fd is not None:
+            # each process drains into its own dup, so this only drops ours
+            os.close(shared_log_fd)
+        if prev_cpus is not None:
+            os.sched_setaffinity(0, prev_cpus)
+
+
+def _fan_in_subscribers(services: list[str], subscribers: int, publishers_per_subscriber: int) -> tuple[SubSpec, ...]:
+    # subscriber i follows the publishers_per_subscriber services starting at i
+    n_pubs = len(services)
+    k = min(publishers_per_subscriber, n_pubs)
+    return tuple(
+        SubSpec(services=tuple(services[(i + j) % n_pubs] for j in range(k)), log_name=f"subscriber-{i:04d}")
+        for i in range(subscribers)
+    )
 
 
 def run_a1_once(
@@ -49,88 +434,30 @@ def run_a1_once(
     poisson: bool,
     seed: int,
     out_dir: Path,
-) -> dict[str, Any]:
-    procs: list[ManagedProcess] = []
-    try:
-        reg = ManagedProcess(
-            argv=[str(bins.wind_registry), "--bind", registry_addr],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "registry.stdout.log",
-            stderr_path=out_dir / "registry.stderr.log",
-        )
-        reg.start()
-        procs.append(reg)
-        _wait_for_registry(registry_addr)
-
-        pub_mode = "poisson" if poisson else "deterministic"
-        publisher = ManagedProcess(
-            argv=[
-                str(bins.wind_agent),
-                "publisher",
-                "--service",
-                service,
-                "--registry",
-                registry_addr,
-                "--duration-secs",
-                str(duration_secs),
-                "--mode",
-                pub_mode,
-                "--hz",
-                str(hz),
-                "--payload-bytes",
-                str(payload_bytes),
-                "--seed",
-                str(seed),
-            ],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "publisher.stdout.log",
-            stderr_path=out_dir / "publisher.stderr.log",
-        )
-        publisher.start()
-        procs.append(publisher)
-
-        time.sleep(0.8)
-
-        subscriber = ManagedProcess(
-            argv=[
-                str(bins.wind_agent),
-                "subscriber",
-                "--service",
-                service,
-                "--registry",
-                registry_addr,
-                "--duration-secs",
-                str(duration_secs),
-            ],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "subscriber.stdout.log",
-            stderr_path=out_dir / "subscriber.stderr.log",
-        )
-        subscriber.start()
-        procs.append(subscriber)
-
-        pids = [p.pid for p in procs if p.pid is not None]
-        samples = collect_while(
-            pids=[int(pid) for pid in pids],
-            should_continue=lambda: subscriber.poll() is None,
-            interval_s=1.0,
-        )
-
-        subscriber.wait(timeout_secs=duration_secs + 10)
-        publisher.terminate()
-
-        sub_res = subscriber.result().json_summary or {}
-        hist = Histogram.from_json(sub_res.get("latency_hist"))
-        return {
-            "subscriber": sub_res,
-            "latency": summarize_hist(hist),
-            "resources": summarize_samples(samples),
-        }
-    finally:
-        terminate_all(reversed(procs))
+    monitor: ResourceMonitor | None = None,
+    registry: ManagedProcess | None = None,
+    capture_stdout: CaptureMode = "file",
+    cpu_plan: CpuPlan | None = None,
+) -> tuple[dict[str, Any], Histogram]:
+    spec = ScenarioSpec(
+        registry_addr=registry_addr,
+        duration_secs=duration_secs,
+        pubs=(
+            PubSpec(
+                service=service,
+                mode="poisson" if poisson else "deterministic",
+                hz=hz,
+                payload_bytes=payload_bytes,
+                seed=seed,
+                log_name="publisher",
+            ),
+        ),
+        subs=(SubSpec(services=(service,), log_name="subscriber"),),
+        multi_subscriber=False,
+        capture_stdout=capture_stdout,
+        cpu_plan=cpu_plan,
+    )
+    return _run_scenario(spec, bins=bins, out_dir=out_dir, monitor=monitor, registry=registry)
 
 
 def run_a2_once(
@@ -144,92 +471,30 @@ def run_a2_once(
     duration_secs: int,
     seed: int,
     out_dir: Path,
-) -> dict[str, Any]:
-    procs: list[ManagedProcess] = []
-    try:
-        reg = ManagedProcess(
-            argv=[str(bins.wind_registry), "--bind", registry_addr],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "registry.stdout.log",
-            stderr_path=out_dir / "registry.stderr.log",
-        )
-        reg.start()
-        procs.append(reg)
-        _wait_for_registry(registry_addr)
-
-        publisher = ManagedProcess(
-            argv=[
-                str(bins.wind_agent),
-                "publisher",
-                "--service",
-                service,
-                "--registry",
-                registry_addr,
-                "--duration-secs",
-                str(duration_secs),
-                "--mode",
-                "deterministic",
-                "--hz",
-                str(hz),
-                "--payload-bytes",
-                str(payload_bytes),
-                "--seed",
-                str(seed),
-            ],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "publisher.stdout.log",
-            stderr_path=out_dir / "publisher.stderr.log",
-        )
-        publisher.start()
-        procs.append(publisher)
-
-        time.sleep(0.8)
-
-        subscribers_procs: list[ManagedProcess] = []
-        for i in range(subscribers):
-            sub = ManagedProcess(
-                argv=[
-                    str(bins.wind_agent),
-                    "subscriber",
-                    "--registry",
-                    registry_addr,
-                    "--duration-secs",
-                    str(duration_secs),
-                    "--service",
-                    service,
-                ],
-                env=None,
-                cwd=None,
-                stdout_path=out_dir / f"subscriber-{i:04d}.stdout.log",
-                stderr_path=out_dir / f"subscriber-{i:04d}.stderr.log",
-            )
-            sub.start()
-            subscribers_procs.append(sub)
-            procs.append(sub)
-
-        pids = [p.pid for p in procs if p.pid is not None]
-        samples = collect_while(
-            pids=[int(pid) for pid in pids],
-            should_continue=lambda: any(p.poll() is None for p in subscribers_procs),
-            interval_s=1.0,
-        )
-
-        for sub in subscribers_procs:
-            sub.wait(timeout_secs=duration_secs + 10)
-
-        publisher.terminate()
-
-        subs = [p.result().json_summary or {} for p in subscribers_procs]
-        merged_hist = _merge_subscriber_hists(subs)
-        return {
-            "subscribers": subs,
-            "latency": summarize_hist(merged_hist),
-            "resources": summarize_samples(samples),
-        }
-    finally:
-        terminate_all(reversed(procs))
+    monitor: ResourceMonitor | None = None,
+    registry: ManagedProcess | None = None,
+    capture_stdout: CaptureMode = "file",
+    cpu_plan: CpuPlan | None = None,
+) -> tuple[dict[str, Any], Histogram]:
+    spec = ScenarioSpec(
+        registry_addr=registry_addr,
+        duration_secs=duration_secs,
+        pubs=(
+            PubSpec(
+                service=service,
+                mode="deterministic",
+                hz=hz,
+                payload_bytes=payload_bytes,
+                seed=seed,
+                log_name="publisher",
+            ),
+        ),
+        subs=tuple(SubSpec(services=(service,), log_name=f"subscriber-{i:04d}") for i in range(subscribers)),
+        multi_subscriber=True,
+        capture_stdout=capture_stdout,
+        cpu_plan=cpu_plan,
+    )
+    return _run_scenario(spec, bins=bins, out_dir=out_dir, monitor=monitor, registry=registry)
 
 
 def run_a3_once(
@@ -242,91 +507,31 @@ def run_a3_once(
     duration_secs: int,
     seed: int,
     out_dir: Path,
-) -> dict[str, Any]:
-    procs: list[ManagedProcess] = []
-    try:
-        reg = ManagedProcess(
-            argv=[str(bins.wind_registry), "--bind", registry_addr],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "registry.stdout.log",
-            stderr_path=out_dir / "registry.stderr.log",
-        )
-        reg.start()
-        procs.append(reg)
-        _wait_for_registry(registry_addr)
-
-        publishers: list[ManagedProcess] = []
-        for i, svc in enumerate(services):
-            pub = ManagedProcess(
-                argv=[
-                    str(bins.wind_agent),
-                    "publisher",
-                    "--service",
-                    svc,
-                    "--registry",
-                    registry_addr,
-                    "--duration-secs",
-                    str(duration_secs),
-                    "--mode",
-                    "deterministic",
-                    "--hz",
-                    str(hz_per_publisher),
-                    "--payload-bytes",
-                    str(payload_bytes),
-                    "--seed",
-                    str(seed + i),
-                ],
-                env=None,
-                cwd=None,
-                stdout_path=out_dir / f"publisher-{i:04d}.stdout.log",
-                stderr_path=out_dir / f"publisher-{i:04d}.stderr.log",
+    monitor: ResourceMonitor | None = None,
+    registry: ManagedProcess | None = None,
+    capture_stdout: CaptureMode = "file",
+    cpu_plan: CpuPlan | None = None,
+) -> tuple[dict[str, Any], Histogram]:
+    spec = ScenarioSpec(
+        registry_addr=registry_addr,
+        duration_secs=duration_secs,
+        pubs=tuple(
+            PubSpec(
+                service=svc,
+                mode="deterministic",
+                hz=hz_per_publisher,
+                payload_bytes=payload_bytes,
+                seed=seed + i,
+                log_name=f"publisher-{i:04d}",
             )
-            pub.start()
-            publishers.append(pub)
-            procs.append(pub)
-
-        time.sleep(1.0)
-
-        subscriber = ManagedProcess(
-            argv=[
-                str(bins.wind_agent),
-                "subscriber",
-                "--registry",
-                registry_addr,
-                "--duration-secs",
-                str(duration_secs),
-                *_subscriber_services_args(services),
-            ],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "subscriber.stdout.log",
-            stderr_path=out_dir / "subscriber.stderr.log",
-        )
-        subscriber.start()
-        procs.append(subscriber)
-
-        pids = [p.pid for p in procs if p.pid is not None]
-        samples = collect_while(
-            pids=[int(pid) for pid in pids],
-            should_continue=lambda: subscriber.poll() is None,
-            interval_s=1.0,
-        )
-
-        subscriber.wait(timeout_secs=duration_secs + 10)
-
-        for pub in publishers:
-            pub.terminate()
-
-        sub_res = subscriber.result().json_summary or {}
-        hist = Histogram.from_json(sub_res.get("latency_hist"))
-        return {
-            "subscriber": sub_res,
-            "latency": summarize_hist(hist),
-            "resources": summarize_samples(samples),
-        }
-    finally:
-        terminate_all(reversed(procs))
+            for i, svc in enumerate(services)
+        ),
+        subs=(SubSpec(services=tuple(services), log_name="subscriber"),),
+        multi_subscriber=False,
+        capture_stdout=capture_stdout,
+        cpu_plan=cpu_plan,
+    )
+    return _run_scenario(spec, bins=bins, out_dir=out_dir, monitor=monitor, registry=registry)
 
 
 def run_a4_once(
@@ -341,97 +546,31 @@ def run_a4_once(
     duration_secs: int,
     seed: int,
     out_dir: Path,
-) -> dict[str, Any]:
-    procs: list[ManagedProcess] = []
-    try:
-        reg = ManagedProcess(
-            argv=[str(bins.wind_registry), "--bind", registry_addr],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "registry.stdout.log",
-            stderr_path=out_dir / "registry.stderr.log",
-        )
-        reg.start()
-        procs.append(reg)
-        _wait_for_registry(registry_addr)
-
-        publishers: list[ManagedProcess] = []
-        for i, svc in enumerate(services):
-            pub = ManagedProcess(
-                argv=[
-                    str(bins.wind_agent),
-                    "publisher",
-                    "--service",
-                    svc,
-                    "--registry",
-                    registry_addr,
-                    "--duration-secs",
-                    str(duration_secs),
-                    "--mode",
-                    "deterministic",
-                    "--hz",
-                    str(hz_per_publisher),
-                    "--payload-bytes",
-                    str(payload_bytes),
-                    "--seed",
-                    str(seed + i),
-                ],
-                env=None,
-                cwd=None,
-                stdout_path=out_dir / f"publisher-{i:04d}.stdout.log",
-                stderr_path=out_dir / f"publisher-{i:04d}.stderr.log",
-            )
-            pub.start()
-            publishers.append(pub)
-            procs.append(pub)
-
-        time.sleep(1.0)
-
-        sub_procs: list[ManagedProcess] = []
-        n_pubs = len(services)
-        for i in range(subscribers):
-            chosen = [services[(i + j) % n_pubs] for j in range(min(publishers_per_subscriber, n_pubs))]
-            sub = ManagedProcess(
-                argv=[
-                    str(bins.wind_agent),
-                    "subscriber",
-                    "--registry",
-                    registry_addr,
-                    "--duration-secs",
-                    str(duration_secs),
-                    *_subscriber_services_args(chosen),
-                ],
-                env=None,
-                cwd=None,
-                stdout_path=out_dir / f"subscriber-{i:04d}.stdout.log",
-                stderr_path=out_dir / f"subscriber-{i:04d}.stderr.log",
+    monitor: ResourceMonitor | None = None,
+    registry: ManagedProcess | None = None,
+    capture_stdout: CaptureMode = "file",
+    cpu_plan: CpuPlan | None = None,
+) -> tuple[dict[str, Any], Histogram]:
+    spec = ScenarioSpec(
+        registry_addr=registry_addr,
+        duration_secs=duration_secs,
+        pubs=tuple(
+            PubSpec(
+                service=svc,
+                mode="deterministic",
+                hz=hz_per_publisher,
+                payload_bytes=payload_bytes,
+                seed=seed + i,
+                log_name=f"publisher-{i:04d}",
             )
-            sub.start()
-            sub_procs.append(sub)
-            procs.append(sub)
-
-        pids = [p.pid for p in procs if p.pid is not None]
-        samples = collect_while(
-            pids=[int(pid) for pid in pids],
-            should_continue=lambda: any(p.poll() is None for p in sub_procs),
-            interval_s=1.0,
-        )
-
-        for sub in sub_procs:
-            sub.wait(timeout_secs=duration_secs + 10)
-
-        for pub in publishers:
-            pub.terminate()
-
-        subs = [p.result().json_summary or {} for p in sub_procs]
-        merged_hist = _merge_subscriber_hists(subs)
-        return {
-            "subscribers": subs,
-            "latency": summarize_hist(merged_hist),
-            "resources": summarize_samples(samples),
-        }
-    finally:
-        terminate_all(reversed(procs))
+            for i, svc in enumerate(services)
+        ),
+        subs=_fan_in_subscribers(services, subscribers, publishers_per_subscriber),
+        multi_subscriber=True,
+        capture_stdout=capture_stdout,
+        cpu_plan=cpu_plan,
+    )
+    return _run_scenario(spec, bins=bins, out_dir=out_dir, monitor=monitor, registry=registry)
 
 
 def run_b1_once(
@@ -443,89 +582,31 @@ def run_b1_once(
     duration_secs: int,
     seed: int,
     out_dir: Path,
-) -> dict[str, Any]:
-    procs: list[ManagedProcess] = []
-    try:
-        reg = ManagedProcess(
-            argv=[str(bins.wind_registry), "--bind", registry_addr],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "registry.stdout.log",
-            stderr_path=out_dir / "registry.stderr.log",
-        )
-        reg.start()
-        procs.append(reg)
-        _wait_for_registry(registry_addr)
-
-        publisher = ManagedProcess(
-            argv=[
-                str(bins.wind_agent),
-                "publisher",
-                "--service",
-                service,
-                "--registry",
-                registry_addr,
-                "--duration-secs",
-                str(duration_secs),
-                "--mode",
-                "poisson",
-                "--hz",
-                str(lambda_hz),
-                "--payload-profile",
-                "iot",
-                "--payload-bytes",
-                "256",
-                "--seed",
-                str(seed),
-            ],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "publisher.stdout.log",
-            stderr_path=out_dir / "publisher.stderr.log",
-        )
-        publisher.start()
-        procs.append(publisher)
-
-        time.sleep(0.8)
-
-        subscriber = ManagedProcess(
-            argv=[
-                str(bins.wind_agent),
-                "subscriber",
-                "--service",
-                service,
-                "--registry",
-                registry_addr,
-                "--duration-secs",
-                str(duration_secs),
-            ],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "subscriber.stdout.log",
-            stderr_path=out_dir / "subscriber.stderr.log",
-        )
-        subscriber.start()
-        procs.append(subscriber)
-
-        pids = [p.pid for p in procs if p.pid is not None]
-        samples = collect_while(
-            pids=[int(pid) for pid in pids],
-            should_continue=lambda: subscriber.poll() is None,
-            interval_s=1.0,
-        )
-
-        subscriber.wait(timeout_secs=duration_secs + 10)
-        publisher.terminate()
-
-        sub_res = subscriber.result().json_summary or {}
-        hist = Histogram.from_json(sub_res.get("latency_hist"))
-        return {
-            "subscriber": sub_res,
-            "latency": summarize_hist(hist),
-            "resources": summarize_samples(samples),
-        }
-    finally:
-        terminate_all(reversed(procs))
+    monitor: ResourceMonitor | None = None,
+    registry: ManagedProcess | None = None,
+    capture_stdout: CaptureMode = "file",
+    cpu_plan: CpuPlan | None = None,
+) -> tuple[dict[str, Any], Histogram]:
+    spec = ScenarioSpec(
+        registry_addr=registry_addr,
+        duration_secs=duration_secs,
+        pubs=(
+            PubSpec(
+                service=service,
+                mode="poisson",
+                hz=lambda_hz,
+                payload_bytes=256,
+                seed=seed,
+                log_name="publisher",
+                payload_profile="iot",
+            ),
+        ),
+        subs=(SubSpec(services=(service,), log_name="subscriber"),),
+        multi_subscriber=False,
+        capture_stdout=capture_stdout,
+        cpu_plan=cpu_plan,
+    )
+    return _run_scenario(spec, bins=bins, out_dir=out_dir, monitor=monitor, registry=registry)
 
 
 def run_b2_once(
@@ -539,96 +620,29 @@ def run_b2_once(
     duration_secs: int,
     seed: int,
     out_dir: Path,
-) -> dict[str, Any]:
-    procs: list[ManagedProcess] = []
-    try:
-        reg = ManagedProcess(
-            argv=[str(bins.wind_registry), "--bind", registry_addr],
-            env=None,
-            cwd=None,
-            stdout_path=out_dir / "registry.stdout.log",
-            stderr_path=out_dir / "registry.stderr.log",
-        )
-        reg.start()
-        procs.append(reg)
-        _wait_for_registry(registry_addr)
-
-        publishers: list[ManagedProcess] = []
-        for i, svc in enumerate(services):
-            pub = ManagedProcess(
-                argv=[
-                    str(bins.wind_agent),
-                    "publisher",
-                    "--service",
-                    svc,
-                    "--registry",
-                    registry_addr,
-                    "--duration-secs",
-                    str(duration_secs),
-                    "--mode",
-                    "poisson",
-                    "--hz",
-                    str(lambda_hz_per_publisher),
-                    "--payload-profile",
-                    "iot",
-                    "--payload-bytes",
-                    "256",
-                    "--seed",
-                    str(seed + i),
-                ],
-                env=None,
-                cwd=None,
-                stdout_path=out_dir / f"publisher-{i:04d}.stdout.log",
-                stderr_path=out_dir / f"publisher-{i:04d}.stderr.log",
-            )
-            pub.start()
-            publishers.append(pub)
-            procs.append(pub)
-
-        time.sleep(1.0)
-
-        sub_procs: list[ManagedProcess] = []
-        n_pubs = len(services)
-        for i in range(subscribers):
-            chosen = [services[(i + j) % n_pubs] for j in range(min(publishers_per_subscriber, n_pubs))]
-            sub = ManagedProcess(
-                argv=[
-                    str(bins.wind_agent),
-                    "subscriber",
-                    "--registry",
-                    registry_addr,
-                    "--duration-secs",
-                    str(duration_secs),
-                    *_subscriber_services_args(chosen),
-                ],
-                env=None,
-                cwd=None,
-                stdout_path=out_dir / f"subscriber-{i:04d}.stdout.log",
-                stderr_path=out_dir / f"subscriber-{i:04d}.stderr.log",
+    monitor: ResourceMonitor | None = None,
+    registry: ManagedProcess | None = None,
+    capture_stdout: CaptureMode = "file",
+    cpu_plan: CpuPlan | None = None,
+) -> tuple[dict[str, Any], Histogram]:
+    spec = ScenarioSpec(
+        registry_addr=registry_addr,
+        duration_secs=duration_secs,
+        pubs=tuple(
+            PubSpec(
+                service=svc,
+                mode="poisson",
+                hz=lambda_hz_per_publisher,
+                payload_bytes=256,
+                seed=seed + i,
+                log_name=f"publisher-{i:04d}",
+                payload_profile="iot",
             )
-            sub.start()
-            sub_procs.append(sub)
-            procs.append(sub)
-
-        pids = [p.pid for p in procs if p.pid is not None]
-        samples = collect_while(
-            pids=[int(pid) for pid in pids],
-            should_continue=lambda: any(p.poll() is None for p in sub_procs),
-            interval_s=1.0,
-        )
-
-        for sub in sub_procs:
-            sub.wait(timeout_secs=duration_secs + 10)
-
-        for pub in publishers:
-            pub.terminate()
-
-        subs = [p.result().json_summary or {} for p in sub_procs]
-        merged_hist = _merge_subscriber_hists(subs)
-        return {
-            "subscribers": subs,
-            "latency": summarize_hist(merged_hist),
-            "resources": summarize_samples(samples),
-        }
-    finally:
-        terminate_all(reversed(procs))
+            for i, svc in enumerate(services)
+        ),
+        subs=_fan_in_subscribers(services, subscribers, publishers_per_subscriber),
+        multi_subscriber=True,
+        capture_stdout=capture_stdout,
+        cpu_plan=cpu_plan,
+    )
+    return _run_scenario(spec, bins=bins, out_dir=out_dir, monitor=monitor, registry=registry)
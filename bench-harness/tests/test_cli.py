@@ -0,0 +1,42 @@
+import stat
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from bench_harness.cli import _run_sweep
+from bench_harness.scenarios import Binaries
+
+# logs each start to the file next to it, then fails before ever listening
+_FAILING_REGISTRY = """\
+import pathlib, sys, time
+with open(pathlib.Path(sys.argv[0]).with_name("starts"), "a") as f:
+    f.write("x")
+time.sleep(0.2)
+sys.exit(3)
+"""
+
+
+class RunSweepTest(unittest.TestCase):
+    def test_failed_replicate_cancels_the_rest(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        registry = root / "registry"
+        registry.write_text(f"#!{sys.executable}\n" + _FAILING_REGISTRY)
+        registry.chmod(registry.stat().st_mode | stat.S_IXUSR)
+        bins = Binaries(wind_registry=registry, wind_agent=root / "agent")
+        kwargs = {"service": "BENCH/T", "payload_bytes": 64, "hz": 10.0, "poisson": False}
+        runs = 12
+        jobs = [
+            ("a1", bins, f"127.0.0.1:{17000 + i}", 1, i, root / f"run-{i:02d}", kwargs)
+            for i in range(runs)
+        ]
+        with self.assertRaises(RuntimeError):
+            for _ in _run_sweep(jobs, parallel=2):
+                pass
+        self.assertLess(len((root / "starts").read_text()), runs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from bench_harness.metrics import BINS, Histogram, HistogramAccumulator, _BIN_LUT, bin_index, summarize_hist
+
+
+class BinIndexTest(unittest.TestCase):
+    def test_exact_below_100(self) -> None:
+        # single-digit values and two-digit values each get a bin of their own
+        self.assertEqual([bin_index(v) for v in (0, 1, 9, 10, 99)], [0, 1, 9, 10, 99])
+        self.assertEqual(bin_index(-5), 0)
+
+    def test_decade_boundaries(self) -> None:
+        self.assertEqual(bin_index(100), 100)
+        self.assertEqual(bin_index(109), 100)
+        self.assertEqual(bin_index(110), 101)
+        self.assertEqual(bin_index(999), 189)
+        self.assertEqual(bin_index(1000), 190)
+        self.assertEqual(bin_index(10**20 - 1), BINS - 1)
+
+    def test_values_past_u64_clamp_to_last_bin(self) -> None:
+        self.assertEqual(bin_index(10**20), BINS - 1)
+        self.assertEqual(bin_index(2**70), BINS - 1)
+
+    def test_lut_matches_bin_index(self) -> None:
+        for v in (0, 9, 10, 99, 100, 12345, len(_BIN_LUT) - 1):
+            self.assertEqual(_BIN_LUT[v], bin_index(v))
+
+
+class SummaryTest(unittest.TestCase):
+    def test_exact_quantiles_below_100(self) -> None:
+        hist = Histogram.from_json([[v, 1] for v in range(1, 101)])
+        s = summarize_hist(hist)
+        self.assertEqual((s["count"], s["min_us"], s["max_us"]), (100, 1, 100))
+        self.assertEqual((s["p50_us"], s["p90_us"], s["p99_us"]), (50, 90, 99))
+
+    def test_binned_quantiles_report_bin_midpoint(self) -> None:
+        # 1234 falls in [1200, 1300)
+        s = summarize_hist(Histogram.from_json([[1005, 1], [1234, 98], [5678, 1]]))
+        self.assertEqual((s["p50_us"], s["p99_us"]), (1250, 1250))
+        self.assertEqual((s["min_us"], s["max_us"]), (1005, 5678))
+
+    def test_quantiles_clamped_to_observed_range(self) -> None:
+        s = summarize_hist(Histogram.from_json([[1234, 5]]))
+        self.assertEqual((s["p50_us"], s["p99_us"]), (1234, 1234))
+
+    def test_huge_values_accepted(self) -> None:
+        s = summarize_hist(Histogram.from_json([[2**70, 1]]))
+        self.assertEqual((s["count"], s["p50_us"], s["p99_us"], s["max_us"]), (1, 2**70, 2**70, 2**70))
+
+    def test_empty(self) -> None:
+        s = summarize_hist(Histogram.from_json([]))
+        self.assertEqual(s["count"], 0)
+        self.assertIsNone(s["p50_us"])
+
+    def test_accumulated_runs_match_single_histogram(self) -> None:
+        a = [[5, 2], [150, 3], [70_000, 1]]
+        b = [[5, 1], [2_000, 4]]
+        acc = HistogramAccumulator()
+        acc.add_histogram(Histogram.from_json(a))
+        acc.add_histogram(Histogram.from_json(b))
+        self.assertEqual(summarize_hist(acc.finalize()), summarize_hist(Histogram.from_json(a + b)))
+
+    def test_merge_all_matches_single_histogram(self) -> None:
+        parts = [[[5, 2], [150, 3]], [], [[70_000, 1], [5, 1]], [[2_000, 4]]]
+        merged = Histogram.merge_all(Histogram.from_json(p) for p in parts)
+        self.assertEqual(merged, Histogram.from_json([pair for p in parts for pair in p]))
+        self.assertEqual(Histogram.merge_all([]), Histogram())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import errno
+import os
+import resource
+import signal
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from bench_harness.proc import _TAIL_CHUNK, _TAIL_KEEP, ManagedProcess, _read_json_summary, start_all, terminate_all, wait_all
+
+
+class WaitAllTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def _sleepers(self, n: int) -> list[ManagedProcess]:
+        return [
+            ManagedProcess(
+                argv=[sys.executable, "-c", "import time; time.sleep(0.3)"],
+                env=None,
+                cwd=None,
+                stdout_path=self.tmp / f"p{i}.stdout.log",
+                stderr_path=self.tmp / f"p{i}.stderr.log",
+            )
+            for i in range(n)
+        ]
+
+    def test_out_of_fds_falls_back_to_wait(self) -> None:
+        procs = self._sleepers(3)
+        start_all(procs)
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        # no room for the selector or a single pidfd
+        open_fds = max(int(fd) for fd in os.listdir("/proc/self/fd"))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (open_fds, hard))
+        try:
+            wait_all(procs, timeout_secs=5.0)
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+        self.assertEqual([p.poll() for p in procs], [0, 0, 0])
+
+
+
+class ReadJsonSummaryTest(unittest.TestCase):
+    def test_summary_across_chunk_boundaries(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / "agent.stdout.log"
+        for size in (200, 3 * _TAIL_CHUNK):
+            with self.subTest(summary_bytes=size):
+                summary = b'{"pad": "' + b"x" * size + b'"}'
+                after = b"log line\n" * (_TAIL_CHUNK // 9)
+                # the last chunk read starts inside the summary line
+                self.assertLess(len(after), _TAIL_CHUNK)
+                self.assertGreater(len(after) + len(summary), _TAIL_CHUNK)
+                path.write_bytes(b'{"stale": 1}\n' + b"log line\n" * 5000 + summary + b"\n" + after)
+                self.assertEqual(_read_json_summary(path), {"pad": "x" * size})
+
+
+class StartTest(unittest.TestCase):
+    def _proc(self, **kwargs) -> ManagedProcess:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return ManagedProcess(
+            argv=[sys.executable, "-c", "pass"],
+            env=None,
+            cwd=None,
+            stdout_path=Path(tmp.name) / "p.stdout.log",
+            stderr_path=Path(tmp.name) / "p.stderr.log",
+            **kwargs,
+        )
+
+    def test_failed_pipe_closes_log_fds(self) -> None:
+        proc = self._proc(capture_stdout="tail")
+        before = sorted(os.listdir("/proc/self/fd"))
+        with mock.patch("os.pipe2", side_effect=OSError(errno.EMFILE, "Too many open files")):
+            with self.assertRaises(OSError):
+                proc.start()
+        self.assertEqual(sorted(os.listdir("/proc/self/fd")), before)
+
+    def test_bad_cpu_list_closes_fds_and_keeps_mask(self) -> None:
+        proc = self._proc(capture_stdout="tail", cpus=[os.cpu_count() + 4096])
+        before = sorted(os.listdir("/proc/self/fd"))
+        mask = os.sched_getaffinity(0)
+        with self.assertRaises(OSError):
+            proc.start()
+        self.assertEqual(sorted(os.listdir("/proc/self/fd")), before)
+        self.assertEqual(os.sched_getaffinity(0), mask)
+
+
+class TerminateTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def _group(self) -> tuple[ManagedProcess, ManagedProcess]:
+        leader, member = (
+            ManagedProcess(
+                argv=[sys.executable, "-c", "import time; time.sleep(30)"],
+                env=None,
+                cwd=None,
+                stdout_path=self.tmp / f"{name}.stdout.log",
+                stderr_path=self.tmp / f"{name}.stderr.log",
+            )
+            for name in ("leader", "member")
+        )
+        leader.start()
+        self.addCleanup(terminate_all, (leader, member), timeout_secs=1.0)
+        member.start(process_group=leader.pid)
+        self.assertEqual(os.getpgid(member.pid), leader.pid)
+        return leader, member
+
+    def test_whole_groups_reaps_leader_and_member(self) -> None:
+        leader, member = self._group()
+        # only the leader is passed in; the killpg must reach the member too
+        terminate_all((leader,), timeout_secs=5.0, whole_groups=True)
+        member.wait(timeout_secs=5.0)
+        self.assertIsNotNone(leader.poll())
+        self.assertIsNotNone(member.poll())
+
+    def test_single_terminate_leaves_the_group_alone(self) -> None:
+        leader, member = self._group()
+        member.terminate(timeout_secs=5.0)
+        self.assertEqual(member.wait(timeout_secs=5.0), -signal.SIGTERM)
+        self.assertIsNone(leader.poll())
+
+
+
+class CaptureTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def _run(self, name: str, script: str, **kwargs) -> ManagedProcess:
+        proc = ManagedProcess(
+            argv=[sys.executable, "-c", script],
+            env=None,
+            cwd=None,
+            stdout_path=self.tmp / f"{name}.stdout.log",
+            stderr_path=self.tmp / f"{name}.stderr.log",
+            log_prefix=f"[{name}] ".encode(),
+            **kwargs,
+        )
+        proc.start()
+        proc.wait(timeout_secs=5.0)
+        return proc
+
+    def test_shared_log_prefixes_every_line(self) -> None:
+        log = self.tmp / "scenario.log"
+        fd = os.open(log, os.O_WRONLY | os.O_CREAT | os.O_APPEND | os.O_CLOEXEC, 0o644)
+        self.addCleanup(os.close, fd)
+        # a line far longer than one pipe read, then an unterminated summary
+        script = "import sys; sys.stdout.write('a' * 300000 + '\\nREADY\\n{\"n\": 1}')"
+        procs = [self._run(name, script, capture_stdout="shared", shared_log_fd=fd) for name in ("p0", "p1")]
+        for proc in procs:
+            self.assertEqual(proc.result().json_summary, {"n": 1})
+            self.assertTrue(proc.wait_ready(timeout_secs=0))
+
+        lines = log.read_bytes().split(b"\n")
+        self.assertEqual(lines.pop(), b"")
+        for name in (b"p0", b"p1"):
+            prefix = b"[" + name + b"] "
+            self.assertEqual(
+                [line for line in lines if line.startswith(prefix)],
+                [prefix + b"a" * 300000, prefix + b"READY", prefix + b'{"n": 1}'],
+            )
+        self.assertEqual(len(lines), 6)
+        self.assertFalse((self.tmp / "p0.stdout.log").exists())
+
+
+    def test_tail_keeps_only_the_last_bytes(self) -> None:
+        script = "print('READY'); [print(f'line {i:05d}') for i in range(2000)]; print('{\"n\": 2}')"
+        proc = self._run("t", script, capture_stdout="tail")
+        self.assertEqual(proc.result().json_summary, {"n": 2})
+        self.assertTrue(proc.wait_ready(timeout_secs=0))
+
+        full = b"".join(b"line %05d\n" % i for i in range(2000)) + b'{"n": 2}\n'
+        kept = (self.tmp / "t.stdout.log").read_bytes()
+        self.assertEqual(kept, full[-_TAIL_KEEP:])
+        self.assertTrue(kept.endswith(b"line 01999\n" + b'{"n": 2}\n'))
+
+
+if __name__ == "__main__":
+    unittest.main()
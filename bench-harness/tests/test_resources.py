@@ -0,0 +1,19 @@
+import os
+import unittest
+
+from bench_harness.resources import ProcStatReader
+
+
+class ProcStatReaderTest(unittest.TestCase):
+    def test_keep_open_false_holds_no_fds(self) -> None:
+        before = len(os.listdir("/proc/self/fd"))
+        with ProcStatReader([os.getpid()], keep_open=False) as reader:
+            self.assertEqual(len(os.listdir("/proc/self/fd")), before)
+            sample = reader.sample(os.getpid())
+            self.assertEqual(len(os.listdir("/proc/self/fd")), before)
+        self.assertIsNotNone(sample.rss_kb)
+        self.assertIsNotNone(sample.utime_ticks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import resource
+import socket
+import stat
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+from pathlib import Path
+
+from bench_harness.proc import ManagedProcess, terminate_all
+from bench_harness.scenarios import Binaries, _wait_for_registry, run_a4_once
+
+_REGISTRY_STUB = """\
+import signal, socket, sys
+host, _, port = sys.argv[sys.argv.index("--bind") + 1].rpartition(":")
+srv = socket.create_server((host, int(port)))
+signal.sigwait({signal.SIGTERM})
+"""
+
+_AGENT_STUB = """\
+import json, sys, time
+args = sys.argv[1:]
+if args[0] == "publisher":
+    print("READY", flush=True)
+    time.sleep(int(args[args.index("--duration-secs") + 1]))
+else:
+    time.sleep(int(args[args.index("--duration-secs") + 1]))
+    print("some log line")
+    summary = json.dumps({"latency_hist": [[100, 3], [250, 1]]})
+    print(summary, flush=True)
+    if "--summary-path" in args:
+        with open(args[args.index("--summary-path") + 1], "w") as f:
+            f.write(summary)
+"""
+
+
+def _write_stub(path: Path, body: str) -> Path:
+    path.write_text(f"#!{sys.executable}\n" + textwrap.dedent(body))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return path
+
+
+def _free_addr() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{s.getsockname()[1]}"
+
+
+class WaitForRegistryTest(unittest.TestCase):
+    def _registry(self, script: str) -> ManagedProcess:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        reg = ManagedProcess(
+            argv=[sys.executable, "-c", script],
+            env=None,
+            cwd=None,
+            stdout_path=Path(tmp.name) / "registry.stdout.log",
+            stderr_path=Path(tmp.name) / "registry.stderr.log",
+        )
+        reg.start()
+        self.addCleanup(terminate_all, (reg,), timeout_secs=1.0)
+        return reg
+
+    def test_times_out_when_nothing_listens(self) -> None:
+        reg = self._registry("import time; time.sleep(30)")
+        with self.assertRaises(TimeoutError):
+            _wait_for_registry(_free_addr(), reg, timeout_secs=0.3)
+
+    def test_dead_registry_raises_before_the_deadline(self) -> None:
+        reg = self._registry("import sys; sys.exit(5)")
+        t0 = time.monotonic()
+        with self.assertRaisesRegex(RuntimeError, "code 5"):
+            _wait_for_registry(_free_addr(), reg, timeout_secs=10.0)
+        self.assertLess(time.monotonic() - t0, 5.0)
+
+
+class LowFdLimitTest(unittest.TestCase):
+    # far below the usual 1024, with more agents than 4 fds each would allow
+    FD_LIMIT = 256
+    SUBSCRIBERS = 100
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.bins = Binaries(
+            wind_registry=_write_stub(self.tmp / "registry", _REGISTRY_STUB),
+            wind_agent=_write_stub(self.tmp / "agent", _AGENT_STUB),
+        )
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        self.addCleanup(resource.setrlimit, resource.RLIMIT_NOFILE, (soft, hard))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(self.FD_LIMIT, soft), hard))
+
+    def test_fan_in_completes(self) -> None:
+        result, hist = run_a4_once(
+            bins=self.bins,
+            registry_addr=_free_addr(),
+            services=["BENCH/T/0000", "BENCH/T/0001"],
+            subscribers=self.SUBSCRIBERS,
+            publishers_per_subscriber=2,
+            payload_bytes=64,
+            hz_per_publisher=10.0,
+            duration_secs=3,
+            seed=1,
+            out_dir=self.tmp / "run",
+        )
+        self.assertEqual(len(result["subscribers"]), self.SUBSCRIBERS)
+        self.assertEqual(hist.total(), 4 * self.SUBSCRIBERS)
+        processes = result["resources"]["processes"]
+        self.assertEqual(len(processes), 3 + self.SUBSCRIBERS)
+        # a /proc stat fd that could not be opened leaves a pid without samples
+        self.assertTrue(all(p["max_rss_kb"] is not None for p in processes.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,7 @@ use std::sync::{
     Arc,
 };
 use tokio::net::{TcpListener, TcpStream};
-use tokio::sync::{broadcast, RwLock};
+use tokio::sync::{broadcast, watch, RwLock};
 use tokio::time::{interval, Duration, Instant};
 use tracing::{debug, error, info, warn};
 use uuid::Uuid;
@@ -83,6 +83,9 @@ pub struct Publisher {
     update_tx: broadcast::Sender<WindValue>,
     _update_rx: broadcast::Receiver<WindValue>,
 
+    // Set once the service is registered with the registry
+    registered: watch::Sender<bool>,
+
     // Configuration
     heartbeat_interval: Duration,
     ttl_ms: u64,
@@ -104,6 +107,7 @@ impl Publisher {
             clients: Arc::new(RwLock::new(HashMap::new())),
             update_tx,
             _update_rx: update_rx,
+            registered: watch::Sender::new(false),
             heartbeat_interval: Duration::from_secs(30),
             ttl_ms: 60000, // 1 minute TTL
             tags: Vec::new(),
@@ -140,6 +144,7 @@ impl Publisher {
 
         // Register with the registry and start heartbeat
         self.register_service(&actual_address).await?;
+        self.registered.send_replace(true);
         self.start_heartbeat_task(actual_address.clone());
 
         // Start the client handler loop
@@ -195,6 +200,11 @@ impl Publisher {
         self.current_value.read().await.clone()
     }
 
+    /// Watch for the service being registered with the registry by `start`
+    pub fn registered(&self) -> watch::Receiver<bool> {
+        self.registered.subscribe()
+    }
+
     /// Get number of active subscribers
     pub async fn subscriber_count(&self) -> usize {
         self.clients.read().await.len()